@@ -0,0 +1,27 @@
+"""
+Add missing indexes to an existing database
+db.create_all() only creates indexes together with new tables, so run this
+after upgrading to create the indexes declared on the models
+"""
+from sqlalchemy import inspect
+from app import app, db
+
+def add_indexes():
+    """Create every index declared on the models that the database does not have yet"""
+    with app.app_context():
+        inspector = inspect(db.engine)
+        tables = set(inspector.get_table_names())
+        created = 0
+        for table in db.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    print(f"Creating index {index.name} on {table.name}...")
+                    index.create(db.engine)
+                    created += 1
+        print(f"✅ Indexes up to date ({created} created)")
+
+if __name__ == '__main__':
+    add_indexes()
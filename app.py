@@ -1,16 +1,33 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, make_response
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from textblob import TextBlob
+from werkzeug.http import is_resource_modified
 import os
+import hashlib
+import importlib.util
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
 from dotenv import load_dotenv
-from sqlalchemy import func
+from sqlalchemy import func, insert, bindparam, case, cast, literal, select, union_all
+from sqlalchemy.dialects import mysql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager
+from metrics import MeteredQueuePool, init_metrics, record_reviews_scanned, render_metrics
+from query_budget import init_query_budget, query_budget
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 
-# Import preprocessing module with error handling
+# Import preprocessing module with error handling. TextBlob itself is only
+# imported when the analytics first run, so just check it is installed here
 try:
-    from preprocessing import ReviewDataProcessor, SentimentAnalyzer, get_review_statistics
+    from preprocessing import ReviewDataProcessor, SentimentAnalyzer, get_review_statistics, get_processor, get_review_snapshot, RATING_FIELDS, RATING_CODE_FIELDS, SENTIMENT_LABELS, ROLLUP_COLUMNS
+    if importlib.util.find_spec('textblob') is None:
+        raise ImportError("No module named 'textblob'")
     PREPROCESSING_AVAILABLE = True
 except ImportError as e:
     print(f"Warning: Preprocessing module not available: {e}")
@@ -20,6 +37,10 @@ except ImportError as e:
         return None
     def SentimentAnalyzer():
         return None
+    def get_processor():
+        return None
+    def get_review_snapshot():
+        return None
     def get_review_statistics(reviews):
         return {
             'total_reviews': len(reviews),
@@ -27,6 +48,10 @@ except ImportError as e:
             'sentiment_distribution': {'positive': 0, 'neutral': 0, 'negative': 0},
             'overall_satisfaction': 0
         }
+    RATING_FIELDS = ['teaching', 'course_content', 'examination', 'lab_support', 'teaching_method', 'library_support']
+    RATING_CODE_FIELDS = {field: f'{field}_code' for field in RATING_FIELDS}
+    SENTIMENT_LABELS = ('happy', 'neutral', 'bad')
+    ROLLUP_COLUMNS = []
 
 # Load .env only in development (not on Vercel)
 if os.getenv('VERCEL') != '1':
@@ -43,23 +68,64 @@ app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # 1 hour
 
-# Vercel serverless optimizations - minimal pooling for serverless
+# Threads running background analytics jobs (see submit_analytics_job)
+ANALYTICS_JOB_WORKERS = int(os.getenv('ANALYTICS_JOB_WORKERS', '2'))
+
+# Vercel serverless optimizations - minimal pooling for serverless;
+# background jobs get overflow connections so they never hold up requests
 app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    # A QueuePool that records checkout waits for /metrics
+    'poolclass': MeteredQueuePool,
     'pool_pre_ping': True,
     'pool_recycle': 280,
     'pool_size': 1,
-    'max_overflow': 0,
-    'connect_args': {
+    'max_overflow': ANALYTICS_JOB_WORKERS
+}
+# connect_timeout is a MySQL driver option; SQLite (local benchmarks) rejects it
+if app.config['SQLALCHEMY_DATABASE_URI'].startswith('mysql'):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS']['connect_args'] = {
         'connect_timeout': 10
     }
-}
+
+# Rows fetched per round trip (and written per response chunk) by the CSV export
+CSV_EXPORT_CHUNK_SIZE = 1000
+
+# Most reviews accepted by one batch submission
+REVIEW_BATCH_LIMIT = 1000
+
+# Columns that identify a ReviewRollup row
+ROLLUP_KEY = ('regulation_id', 'semester_id', 'subject_id', 'day')
+
+# Jobs not finished this long after submission are marked failed (their process died),
+# and finished jobs are deleted this long after they finish
+ANALYTICS_JOB_TIMEOUT = timedelta(minutes=15)
+ANALYTICS_JOB_RETENTION = timedelta(days=1)
+
+# Live dashboard stream: how long one stream stays open, and seconds between
+# checks for reviews committed by other processes while it is. An open stream
+# holds a worker thread, so it is opt-in for threaded or async servers; with 0
+# each connection checks once and closes, and the browser reconnects after
+# ANALYTICS_STREAM_RECONNECT_SECONDS (short polling)
+ANALYTICS_STREAM_SECONDS = int(os.getenv('ANALYTICS_STREAM_SECONDS', '0'))
+ANALYTICS_STREAM_POLL_SECONDS = 5
+ANALYTICS_STREAM_RECONNECT_SECONDS = 30
+
+# Time-trend buckets, and how many buckets the rolling average spans for each
+TREND_GRANULARITIES = ('day', 'week', 'month')
+TREND_ROLLING_WINDOW = {'day': 7, 'week': 4, 'month': 3}
 
 db = SQLAlchemy(app)
+init_metrics(app, db)
+init_query_budget(app, db)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
 # Models
 class User(UserMixin, db.Model):
+    __table_args__ = (
+        # Login lookups by (reg_no, role) and student counts by role
+        db.Index('ix_user_role_reg_no', 'role', 'reg_no'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(150), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
@@ -75,12 +141,18 @@ class Regulation(db.Model):
     is_active = db.Column(db.Boolean, default=True)
 
 class Semester(db.Model):
+    __table_args__ = (
+        db.Index('ix_semester_regulation_sequence', 'regulation_id', 'sequence'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     regulation_id = db.Column(db.Integer, db.ForeignKey('regulation.id'), nullable=False)
     name = db.Column(db.String(50), nullable=False)
     sequence = db.Column(db.Integer, nullable=False)
 
 class Subject(db.Model):
+    __table_args__ = (
+        db.Index('ix_subject_semester_id', 'semester_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     semester_id = db.Column(db.Integer, db.ForeignKey('semester.id'), nullable=False)
     course_code = db.Column(db.String(20), nullable=False)
@@ -91,7 +163,23 @@ class Subject(db.Model):
     category = db.Column(db.String(50), nullable=False)
     practical = db.Column(db.String(200), nullable=True)
 
+# One byte per rating code on MySQL
+RatingCode = db.SmallInteger().with_variant(mysql.TINYINT(unsigned=True), 'mysql')
+
+class RatingLabel(db.Model):
+    """Label of each rating code stored on Review (0 for no rating, else 1-5)"""
+    code = db.Column(RatingCode, primary_key=True, autoincrement=False)
+    label = db.Column(db.String(20), nullable=False)
+
 class Review(db.Model):
+    __table_args__ = (
+        # Each filter of the analytics and the CSV export, in created_at order;
+        # (student_id, created_at) also serves the student's own review list
+        db.Index('ix_review_student_created', 'student_id', 'created_at'),
+        db.Index('ix_review_regulation_created', 'regulation_id', 'created_at'),
+        db.Index('ix_review_semester_created', 'semester_id', 'created_at'),
+        db.Index('ix_review_subject_created', 'subject_id', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     regulation_id = db.Column(db.Integer, db.ForeignKey('regulation.id'), nullable=False)
@@ -105,21 +193,113 @@ class Review(db.Model):
     teaching_method = db.Column(db.Text, nullable=True)
     library_support = db.Column(db.Text, nullable=True)
     comment = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    # Rating codes (see RatingLabel) set when the review is saved, so the analytics
+    # never parse the rating text (see migrate_rating_codes.py for older rows)
+    teaching_code = db.Column(RatingCode, nullable=True)
+    course_content_code = db.Column(RatingCode, nullable=True)
+    examination_code = db.Column(RatingCode, nullable=True)
+    lab_support_code = db.Column(RatingCode, nullable=True)
+    teaching_method_code = db.Column(RatingCode, nullable=True)
+    library_support_code = db.Column(RatingCode, nullable=True)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp(), index=True)
+    # Sentiment is scored once when the review is saved (see backfill_sentiment.py for older rows)
+    sentiment_label = db.Column(db.String(10), nullable=True)
+    sentiment_polarity = db.Column(db.Float, nullable=True)
+    sentiment_subjectivity = db.Column(db.Float, nullable=True)
 
     student = db.relationship('User', backref='reviews')
     regulation = db.relationship('Regulation', backref='reviews')
     semester = db.relationship('Semester', backref='reviews')
     subject = db.relationship('Subject', backref='reviews')
 
+class ReviewRollup(db.Model):
+    """
+    Running review totals per (regulation, semester, subject, day)
+    Updated in the same transaction as the reviews it counts; rebuild_rollups.py
+    regenerates the table from Review
+    """
+    __table_args__ = (
+        db.UniqueConstraint('regulation_id', 'semester_id', 'subject_id', 'day', name='uq_review_rollup_key'),
+        # The unique key serves regulation filters; these serve semester and subject filters
+        db.Index('ix_review_rollup_semester_day', 'semester_id', 'day'),
+        db.Index('ix_review_rollup_subject_day', 'subject_id', 'day'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    regulation_id = db.Column(db.Integer, db.ForeignKey('regulation.id'), nullable=False)
+    semester_id = db.Column(db.Integer, db.ForeignKey('semester.id'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
+    day = db.Column(db.Date, nullable=True, index=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    # Rating sums and 1-5 histograms per rating field
+    teaching_sum = db.Column(db.Integer, nullable=False, default=0)
+    teaching_1 = db.Column(db.Integer, nullable=False, default=0)
+    teaching_2 = db.Column(db.Integer, nullable=False, default=0)
+    teaching_3 = db.Column(db.Integer, nullable=False, default=0)
+    teaching_4 = db.Column(db.Integer, nullable=False, default=0)
+    teaching_5 = db.Column(db.Integer, nullable=False, default=0)
+    course_content_sum = db.Column(db.Integer, nullable=False, default=0)
+    course_content_1 = db.Column(db.Integer, nullable=False, default=0)
+    course_content_2 = db.Column(db.Integer, nullable=False, default=0)
+    course_content_3 = db.Column(db.Integer, nullable=False, default=0)
+    course_content_4 = db.Column(db.Integer, nullable=False, default=0)
+    course_content_5 = db.Column(db.Integer, nullable=False, default=0)
+    examination_sum = db.Column(db.Integer, nullable=False, default=0)
+    examination_1 = db.Column(db.Integer, nullable=False, default=0)
+    examination_2 = db.Column(db.Integer, nullable=False, default=0)
+    examination_3 = db.Column(db.Integer, nullable=False, default=0)
+    examination_4 = db.Column(db.Integer, nullable=False, default=0)
+    examination_5 = db.Column(db.Integer, nullable=False, default=0)
+    lab_support_sum = db.Column(db.Integer, nullable=False, default=0)
+    lab_support_1 = db.Column(db.Integer, nullable=False, default=0)
+    lab_support_2 = db.Column(db.Integer, nullable=False, default=0)
+    lab_support_3 = db.Column(db.Integer, nullable=False, default=0)
+    lab_support_4 = db.Column(db.Integer, nullable=False, default=0)
+    lab_support_5 = db.Column(db.Integer, nullable=False, default=0)
+    teaching_method_sum = db.Column(db.Integer, nullable=False, default=0)
+    teaching_method_1 = db.Column(db.Integer, nullable=False, default=0)
+    teaching_method_2 = db.Column(db.Integer, nullable=False, default=0)
+    teaching_method_3 = db.Column(db.Integer, nullable=False, default=0)
+    teaching_method_4 = db.Column(db.Integer, nullable=False, default=0)
+    teaching_method_5 = db.Column(db.Integer, nullable=False, default=0)
+    library_support_sum = db.Column(db.Integer, nullable=False, default=0)
+    library_support_1 = db.Column(db.Integer, nullable=False, default=0)
+    library_support_2 = db.Column(db.Integer, nullable=False, default=0)
+    library_support_3 = db.Column(db.Integer, nullable=False, default=0)
+    library_support_4 = db.Column(db.Integer, nullable=False, default=0)
+    library_support_5 = db.Column(db.Integer, nullable=False, default=0)
+    # Sentiment label counts and polarity sum
+    happy_count = db.Column(db.Integer, nullable=False, default=0)
+    neutral_count = db.Column(db.Integer, nullable=False, default=0)
+    bad_count = db.Column(db.Integer, nullable=False, default=0)
+    polarity_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+class AnalyticsJob(db.Model):
+    """
+    A heavy analytics request run in the background (see submit_analytics_job)
+    State lives in the database so any worker process can answer a status poll
+    """
+    id = db.Column(db.String(32), primary_key=True)
+    endpoint = db.Column(db.String(100), nullable=False)
+    query_string = db.Column(db.Text, nullable=False, default='')
+    # queued, running, done or failed
+    status = db.Column(db.String(10), nullable=False, default='queued')
+    mimetype = db.Column(db.String(50), nullable=True)
+    result = db.Column(db.Text().with_variant(mysql.LONGTEXT, 'mysql'), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # One primary key lookup per request; Flask-Login keeps the user for the rest of it
+    return db.session.get(User, int(user_id))
 
 # Sentiment Analysis Helper
 def analyze_sentiment(text):
     if not text:
         return 'neutral', 0.0
+    from textblob import TextBlob
     blob = TextBlob(text)
     polarity = blob.sentiment.polarity
     if polarity > 0.1:
@@ -129,6 +309,573 @@ def analyze_sentiment(text):
     else:
         return 'neutral', polarity
 
+# Analytics rollup helpers
+def add_rollup_row(key, values):
+    """Add one key's totals to its ReviewRollup row, creating the row when missing"""
+    key = dict(zip(ROLLUP_KEY, key))
+    increments = {getattr(ReviewRollup, name): getattr(ReviewRollup, name) + value for name, value in values.items()}
+    if ReviewRollup.query.filter_by(**key).update(increments, synchronize_session=False):
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(ReviewRollup(**key, **values))
+    except IntegrityError:
+        # A concurrent submission created the row first
+        ReviewRollup.query.filter_by(**key).update(increments, synchronize_session=False)
+
+def apply_rollup_totals(totals):
+    """
+    Add totals from ReviewDataProcessor.rollup_totals to the ReviewRollup rows
+    Existing rows are incremented in one UPDATE batch and new rows inserted in one
+    INSERT batch. Runs in the caller's transaction, so the rollups commit together
+    with the reviews
+    """
+    if not totals:
+        return
+    existing = {tuple(row) for row in db.session.query(*[getattr(ReviewRollup, name) for name in ROLLUP_KEY]).filter(
+        ReviewRollup.subject_id.in_({key[2] for key in totals}),
+        ReviewRollup.day.in_({key[3] for key in totals})
+    )}
+    
+    updates = [(key, values) for key, values in totals.items() if key in existing]
+    if updates:
+        table = ReviewRollup.__table__
+        statement = table.update().where(
+            *[table.c[name] == bindparam(f'key_{name}') for name in ROLLUP_KEY]
+        ).values({name: table.c[name] + bindparam(f'add_{name}') for name in ROLLUP_COLUMNS})
+        db.session.execute(statement, [
+            dict({f'key_{name}': value for name, value in zip(ROLLUP_KEY, key)},
+                 **{f'add_{name}': value for name, value in values.items()})
+            for key, values in updates
+        ])
+    
+    inserts = [(key, values) for key, values in totals.items() if key not in existing]
+    if inserts:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(ReviewRollup), [dict(zip(ROLLUP_KEY, key), **values) for key, values in inserts])
+        except IntegrityError:
+            # A concurrent submission created some of the rows first
+            for key, values in inserts:
+                add_rollup_row(key, values)
+
+def rollup_query(*columns, key=None, criteria=()):
+    """Query columns over the rollups, joining Semester when key is one of its columns"""
+    query = db.session.query(*columns).select_from(ReviewRollup)
+    if key is not None and getattr(key, 'table', None) is Semester.__table__:
+        query = query.join(Semester, ReviewRollup.semester_id == Semester.id)
+    if criteria:
+        query = query.filter(*criteria)
+    return query
+
+def rollup_columns():
+    """Aggregate columns: the sum of every additive rollup column"""
+    return [func.sum(getattr(ReviewRollup, name)) for name in ROLLUP_COLUMNS]
+
+def parse_rollup_columns(values):
+    """
+    Turn the values of rollup_columns() into analytics totals
+    Returns dict with count, average_ratings, rating_distribution,
+    sentiment_distribution, average_polarity and polarity_sum
+    """
+    totals = {name: value or 0 for name, value in zip(ROLLUP_COLUMNS, values)}
+    averages = {}
+    distributions = {}
+    for field in RATING_FIELDS:
+        distribution = {value: int(totals[f'{field}_{value}']) for value in range(1, 6)}
+        rated = sum(distribution.values())
+        averages[field] = round(float(totals[f'{field}_sum']) / rated, 2) if rated else 0
+        distributions[field] = distribution
+    count = int(totals['review_count'])
+    return {
+        'count': count,
+        'average_ratings': averages,
+        'rating_distribution': distributions,
+        'sentiment_distribution': {label: int(totals[f'{label}_count']) for label in SENTIMENT_LABELS},
+        'average_polarity': round(float(totals['polarity_sum']) / count, 3) if count else 0,
+        'polarity_sum': float(totals['polarity_sum'])
+    }
+
+def rollup_aggregates(*criteria, filters=None):
+    """Analytics totals over the matching rollups, in a single aggregate query"""
+    if filters is not None and filters.student_id is not None:
+        groups = student_rollup_aggregates(filters, lambda key: True)
+        return groups.get(True) or parse_rollup_columns([0] * len(ROLLUP_COLUMNS))
+    criteria = list(criteria) + rollup_filter_criteria(filters)
+    row = rollup_query(*rollup_columns(), criteria=criteria).one()
+    totals = parse_rollup_columns(row)
+    record_reviews_scanned(totals['count'])
+    return totals
+
+def grouped_rollup_aggregates(group_by, *criteria, filters=None, key=None):
+    """
+    Analytics totals per value of group_by, in a single GROUP BY query over the rollups
+    key computes the same group from a rollup key tuple, for student-filtered
+    requests (see student_rollup_aggregates); it defaults to the matching
+    ReviewRollup / Semester column
+    Returns: {group value: totals shaped like rollup_aggregates}
+    """
+    if filters is not None and filters.student_id is not None:
+        return student_rollup_aggregates(filters, key or rollup_group_key(group_by))
+    criteria = list(criteria) + rollup_filter_criteria(filters)
+    rows = rollup_query(group_by, *rollup_columns(), key=group_by, criteria=criteria).group_by(group_by).all()
+    groups = {row[0]: parse_rollup_columns(row[1:]) for row in rows}
+    record_reviews_scanned(sum(group['count'] for group in groups.values()))
+    return groups
+
+def rollup_group_key(group_by):
+    """Python equivalent of grouping by a ReviewRollup or Semester column, over rollup key tuples"""
+    if getattr(group_by, 'table', None) is Semester.__table__:
+        semesters = dict(db.session.query(Semester.id, group_by))
+        return lambda key: semesters.get(key[1])
+    position = ROLLUP_KEY.index(group_by.key)
+    return lambda key: key[position]
+
+def student_rollup_aggregates(filters, key):
+    """
+    Analytics totals for a student-filtered request, which the rollups cannot
+    answer: only the student's matching reviews are loaded and rolled up in memory
+    Groups by key(rollup key tuple), skipping rollups whose key is None
+    Returns: {group value: totals shaped like rollup_aggregates}
+    """
+    reviews = Review.query.filter(*review_filter_criteria(filters)).all()
+    record_reviews_scanned(len(reviews))
+    groups = {}
+    for rollup_key, values in get_processor().rollup_totals(reviews).items():
+        group = key(rollup_key)
+        if group is None:
+            continue
+        totals = groups.setdefault(group, dict.fromkeys(ROLLUP_COLUMNS, 0))
+        for name in ROLLUP_COLUMNS:
+            totals[name] += values[name]
+    return {group: parse_rollup_columns([totals[name] for name in ROLLUP_COLUMNS]) for group, totals in groups.items()}
+
+# Analytics filters
+def normalize_id(val):
+    """Integer id from a query parameter; '', 'all', 'undefined', 'null' and 'none' mean not provided"""
+    if val is None:
+        return None
+    sval = str(val).strip().lower()
+    if sval in ('', 'all', 'undefined', 'null', 'none'):
+        return None
+    try:
+        return int(val)
+    except (TypeError, ValueError):
+        return None
+
+def parse_date_arg(name):
+    """Optional YYYY-MM-DD query parameter; raises ValueError when malformed"""
+    value = request.args.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"'{name}' must be a date in YYYY-MM-DD format")
+
+def parse_analytics_filters():
+    """
+    Filters of an analytics or export request: regulation_id, semester_id,
+    subject_id and student_id (normalized with normalize_id) and the inclusive
+    from / to dates (YYYY-MM-DD). Raises ValueError for a malformed date
+    Returns SimpleNamespace with regulation_id, semester_id, subject_id, student_id, start and end
+    """
+    return SimpleNamespace(
+        regulation_id=normalize_id(request.args.get('regulation_id')),
+        semester_id=normalize_id(request.args.get('semester_id')),
+        subject_id=normalize_id(request.args.get('subject_id')),
+        student_id=normalize_id(request.args.get('student_id')),
+        start=parse_date_arg('from'),
+        end=parse_date_arg('to')
+    )
+
+def review_filter_criteria(filters):
+    """SQL predicates on Review for the filters"""
+    criteria = []
+    for name in ('regulation_id', 'semester_id', 'subject_id', 'student_id'):
+        value = getattr(filters, name)
+        if value is not None:
+            criteria.append(getattr(Review, name) == value)
+    if filters.start:
+        criteria.append(Review.created_at >= datetime.combine(filters.start, datetime.min.time()))
+    if filters.end:
+        criteria.append(Review.created_at < datetime.combine(filters.end + timedelta(days=1), datetime.min.time()))
+    return criteria
+
+def rollup_filter_criteria(filters):
+    """SQL predicates on ReviewRollup for the filters; there is no student column (see student_rollup_aggregates)"""
+    criteria = []
+    if filters is None:
+        return criteria
+    for name in ('regulation_id', 'semester_id', 'subject_id'):
+        value = getattr(filters, name)
+        if value is not None:
+            criteria.append(getattr(ReviewRollup, name) == value)
+    if filters.start:
+        criteria.append(ReviewRollup.day >= filters.start)
+    if filters.end:
+        criteria.append(ReviewRollup.day <= filters.end)
+    return criteria
+
+def date_bucket(column, granularity):
+    """SQL expression for the first day of the day, week (Monday) or month containing column"""
+    if granularity == 'day':
+        return column
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        if granularity == 'week':
+            return func.date(column, 'weekday 0', '-6 days')
+        return func.date(column, 'start of month')
+    if dialect == 'mysql':
+        if granularity == 'week':
+            return func.subdate(column, func.weekday(column))
+        return func.subdate(column, func.dayofmonth(column) - 1)
+    return db.cast(func.date_trunc(granularity, column), db.Date)
+
+def bucket_start(day, granularity):
+    """First day of the bucket containing day, as date_bucket computes it in SQL"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+def bucket_index(day, granularity):
+    """Consecutive integer per bucket, so gaps between buckets can be measured"""
+    if granularity == 'month':
+        return day.year * 12 + day.month
+    if granularity == 'week':
+        return day.toordinal() // 7
+    return day.toordinal()
+
+def rolling_average_polarity(buckets, granularity, window):
+    """
+    Review-weighted average polarity over each bucket and the window - 1 buckets before it
+    buckets: sorted list of (day, totals); empty buckets count as having no reviews
+    """
+    averages = []
+    start = 0
+    count = 0
+    polarity = 0.0
+    for day, totals in buckets:
+        index = bucket_index(day, granularity)
+        count += totals['count']
+        polarity += totals['polarity_sum']
+        while bucket_index(buckets[start][0], granularity) <= index - window:
+            count -= buckets[start][1]['count']
+            polarity -= buckets[start][1]['polarity_sum']
+            start += 1
+        averages.append(round(polarity / count, 3) if count else 0)
+    return averages
+
+# Columnar review snapshot for the dashboard
+# Rows are fetched into the snapshot in chunks of this many reviews
+SNAPSHOT_FETCH_ROWS = 5000
+
+def snapshot_columns():
+    """
+    Review columns loaded into the snapshot
+    The text columns are only read for rows without rating codes or stored sentiment
+    """
+    unscored = Review.sentiment_label.is_(None)
+    codes = [getattr(Review, RATING_CODE_FIELDS[field]) for field in RATING_FIELDS]
+    texts = [case((code.is_(None) | unscored, getattr(Review, field))).label(field) for field, code in zip(RATING_FIELDS, codes)]
+    return [Review.id, Review.student_id, Review.regulation_id, Review.semester_id, Review.subject_id,
+            *codes, *texts, Review.created_at, case((unscored, Review.comment)).label('comment'),
+            Review.sentiment_label, Review.sentiment_polarity, Review.sentiment_subjectivity]
+
+def refresh_review_snapshot():
+    """
+    Bring the shared review snapshot up to date, or None without NumPy
+    New reviews are fetched by id. Rows changed in place (re-scoring, deletes)
+    are caught by comparing the snapshot with the rollup totals, which reloads
+    it whole; the check runs only when the rollup totals moved since last time
+    """
+    snapshot = get_review_snapshot()
+    if snapshot is None:
+        return None
+    
+    with snapshot.lock:
+        def load_new_reviews():
+            while True:
+                rows = db.session.query(*snapshot_columns()).filter(Review.id > snapshot.last_id)\
+                    .order_by(Review.id).limit(SNAPSHOT_FETCH_ROWS).all()
+                snapshot.append(rows)
+                if len(rows) < SNAPSHOT_FETCH_ROWS:
+                    break
+        
+        load_new_reviews()
+        totals = tuple(int(value or 0) for value in db.session.query(
+            func.sum(ReviewRollup.review_count),
+            func.sum(ReviewRollup.happy_count),
+            func.sum(ReviewRollup.bad_count)
+        ).one())
+        if totals != snapshot.checked_totals:
+            if snapshot.totals() != totals:
+                snapshot.clear()
+                load_new_reviews()
+            snapshot.checked_totals = totals
+    return snapshot
+
+# Conditional GET for analytics responses
+def analytics_data_version():
+    """
+    Cheap fingerprint of the data behind the analytics: the newest review by
+    primary key plus the rollup totals, which change with every submission,
+    rollup rebuild and sentiment re-score, plus catalog_fingerprint for the
+    student count and the subject and regulation names the responses show
+    Returns: (version tuple, created_at of the newest review or None)
+    """
+    latest = db.session.query(Review.id, Review.created_at).order_by(Review.id.desc()).first()
+    rollups = db.session.query(
+        func.count(ReviewRollup.id),
+        func.max(ReviewRollup.id),
+        func.sum(ReviewRollup.review_count),
+        func.sum(ReviewRollup.happy_count),
+        func.sum(ReviewRollup.bad_count)
+    ).one()
+    version = (latest.id if latest else None,) + tuple(rollups) + (catalog_fingerprint(),)
+    return version, latest.created_at if latest else None
+
+def catalog_fingerprint():
+    """
+    Hash of the regulation, semester and subject rows and of the student count
+    and newest student, so a rename or a registration changes the analytics
+    ETag; the catalog is a few hundred rows and students are counted by index
+    """
+    rows = db.session.execute(union_all(
+        select(literal('students'), func.count(User.id), func.max(User.id), literal(''), literal('')).where(User.role == 'student'),
+        select(literal('regulation'), Regulation.id, literal(0), Regulation.code, Regulation.title),
+        select(literal('semester'), Semester.id, Semester.regulation_id, Semester.name, cast(Semester.sequence, db.String)),
+        select(literal('subject'), Subject.id, Subject.semester_id, Subject.course_code, Subject.course_name)
+    )).all()
+    return hashlib.sha1(repr(sorted(tuple(row) for row in rows)).encode()).hexdigest()
+
+def conditional_analytics(view):
+    """
+    Send an analytics response with an ETag and Last-Modified from
+    analytics_data_version, answering If-None-Match / If-Modified-Since
+    with 304 before the view does any work
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
+            return view(*args, **kwargs)
+        
+        version, last_modified = analytics_data_version()
+        etag = hashlib.sha1(f'{request.full_path}|{version}'.encode()).hexdigest()
+        # Only the ETag decides: Last-Modified is the newest review and does
+        # not move when students or the catalog change
+        if is_resource_modified(request.environ, etag=etag):
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        else:
+            response = app.response_class(status=304)
+        
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        # Let browsers keep the response but revalidate it on every load
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    return wrapper
+
+# Live dashboard updates
+_review_listeners = threading.Condition()
+
+def notify_review_listeners():
+    """Wake the dashboard streams of this process after reviews are committed"""
+    with _review_listeners:
+        _review_listeners.notify_all()
+
+def analytics_delta(rows):
+    """
+    Dashboard increments for newly committed reviews (rows of snapshot_columns):
+    count, sentiment counts, per-field rating histograms and sums, and one
+    time-trend point per day
+    """
+    totals = dict.fromkeys(ROLLUP_COLUMNS, 0)
+    days = {}
+    for (_, _, _, day), values in get_processor().rollup_totals(rows).items():
+        day_totals = days.setdefault(day, dict.fromkeys(ROLLUP_COLUMNS, 0))
+        for name in ROLLUP_COLUMNS:
+            totals[name] += values[name]
+            day_totals[name] += values[name]
+    
+    delta = parse_rollup_columns([totals[name] for name in ROLLUP_COLUMNS])
+    delta['rating_sums'] = {field: int(totals[f'{field}_sum']) for field in RATING_FIELDS}
+    delta['time_trends'] = []
+    for day, day_totals in sorted((day, day_totals) for day, day_totals in days.items() if day):
+        point = parse_rollup_columns([day_totals[name] for name in ROLLUP_COLUMNS])
+        delta['time_trends'].append({
+            'date': day.strftime('%Y-%m-%d'),
+            'count': point['count'],
+            'counts': point['sentiment_distribution'],
+            'polarity_sum': point['polarity_sum']
+        })
+    return delta
+
+# Background analytics jobs
+_job_executor = None
+
+def job_executor():
+    """Thread pool running the analytics jobs of this process"""
+    global _job_executor
+    if _job_executor is None:
+        _job_executor = ThreadPoolExecutor(max_workers=max(ANALYTICS_JOB_WORKERS, 1), thread_name_prefix='analytics-job')
+    return _job_executor
+
+def submit_analytics_job(endpoint, query_string):
+    """
+    Queue the view of endpoint to run in the background on query_string
+    An identical job that is still pending is reused instead of queueing another
+    Returns the AnalyticsJob
+    """
+    now = datetime.utcnow()
+    AnalyticsJob.query.filter(
+        AnalyticsJob.status.in_(('done', 'failed')),
+        AnalyticsJob.finished_at < now - ANALYTICS_JOB_RETENTION
+    ).delete(synchronize_session=False)
+    fail_stale_jobs(now)
+    
+    job = AnalyticsJob.query.filter(
+        AnalyticsJob.endpoint == endpoint,
+        AnalyticsJob.query_string == query_string,
+        AnalyticsJob.status.in_(('queued', 'running')),
+        AnalyticsJob.created_at >= now - ANALYTICS_JOB_TIMEOUT
+    ).first()
+    if job is None:
+        job = AnalyticsJob(id=uuid.uuid4().hex, endpoint=endpoint, query_string=query_string, status='queued', created_at=now)
+        db.session.add(job)
+    db.session.commit()
+    job_executor().submit(run_analytics_job, job.id)
+    return job
+
+def fail_stale_jobs(now=None):
+    """
+    Mark jobs still queued or running after ANALYTICS_JOB_TIMEOUT as failed:
+    their worker thread died with its process (a restart, a frozen instance)
+    """
+    now = now or datetime.utcnow()
+    AnalyticsJob.query.filter(
+        AnalyticsJob.status.in_(('queued', 'running')),
+        AnalyticsJob.created_at < now - ANALYTICS_JOB_TIMEOUT
+    ).update({'status': 'failed', 'error': 'Job did not finish in time', 'finished_at': now}, synchronize_session=False)
+
+def run_analytics_job(job_id):
+    """Run a queued job's view in a request context of its own and store the response"""
+    with app.app_context():
+        # A reused job may be picked up twice; only the first worker runs it
+        claimed = AnalyticsJob.query.filter_by(id=job_id, status='queued').update(
+            {'status': 'running', 'started_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            return
+        
+        job = db.session.get(AnalyticsJob, job_id)
+        try:
+            path = next(app.url_map.iter_rules(job.endpoint)).rule
+            with app.test_request_context(path, query_string=job.query_string):
+                # The admin check passed when the job was submitted
+                session['admin'] = True
+                response = make_response(app.view_functions[job.endpoint]())
+                body = response.get_data(as_text=True)
+            if response.status_code == 200:
+                job.status, job.mimetype, job.result = 'done', response.mimetype, body
+            else:
+                job.status, job.error = 'failed', f'{response.status_code}: {body[:1000]}'
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(AnalyticsJob, job_id)
+            job.status, job.error = 'failed', f'{type(e).__name__}: {e}'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+def analytics_job_status(job):
+    """JSON view of a job for the status poll"""
+    status = job.status
+    data = {
+        'job_id': job.id,
+        'endpoint': job.endpoint,
+        'status': status,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'status_url': url_for('api_job_status', job_id=job.id)
+    }
+    if status == 'done':
+        data['result_url'] = url_for('api_job_result', job_id=job.id)
+    elif status == 'failed':
+        data['error'] = job.error
+    return data
+
+def async_requested():
+    return request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+def background_job(view):
+    """
+    Let a heavy route run as a background job: with ?async=1 an admin gets
+    202 and a job id at once, and polls /api/jobs/<job_id> for the result.
+    On Vercel nothing runs after the response is sent, so the route answers inline
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not async_requested() or os.getenv('VERCEL') == '1':
+            return view(*args, **kwargs)
+        if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        # Report bad filters now rather than as a failed job
+        try:
+            parse_analytics_filters()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query_string = '&'.join(
+            part for part in request.query_string.decode().split('&') if part and part.split('=')[0] != 'async'
+        )
+        job = submit_analytics_job(request.endpoint, query_string)
+        response = jsonify(analytics_job_status(job))
+        response.status_code = 202
+        response.headers['Location'] = url_for('api_job_status', job_id=job.id)
+        return response
+    return wrapper
+
+# Review submission helper
+def save_reviews(student_id, regulation_id, entries):
+    """
+    Insert a student's reviews in one INSERT batch
+    entries are dicts with semester_id, subject_id, the rating fields and comment.
+    Sentiment is scored and the rollups updated in the same transaction; the caller commits
+    Returns the number of reviews inserted
+    """
+    # One database timestamp for the batch, so the rollup day matches created_at
+    submitted_at = db.session.query(func.current_timestamp()).scalar()
+    records = [
+        SimpleNamespace(
+            student_id=student_id,
+            regulation_id=regulation_id,
+            semester_id=entry['semester_id'],
+            subject_id=entry['subject_id'],
+            feedback=entry.get('comment') or 'submitted',
+            comment=entry.get('comment'),
+            created_at=submitted_at,
+            **{field: entry[field] for field in RATING_FIELDS}
+        )
+        for entry in entries
+    ]
+    if PREPROCESSING_AVAILABLE:
+        processor = get_processor()
+        processor.score_reviews(records)
+        processor.encode_ratings(records)
+    # A Core insert on the table: the ORM bulk insert leaves None values out of
+    # a row, and splits the batch wherever rows with and without a comment meet
+    db.session.execute(insert(Review.__table__), [vars(record) for record in records])
+    if PREPROCESSING_AVAILABLE:
+        apply_rollup_totals(processor.rollup_totals(records))
+    return len(records)
+
 # Safe password verification helper
 def safe_check_password_hash(pwhash, password):
     """Safely check password hash, handling legacy sha256 hashes"""
@@ -153,6 +900,7 @@ def safe_check_password_hash(pwhash, password):
 
 # Routes
 @app.route('/')
+@query_budget(1)
 def index():
     if current_user.is_authenticated:
         if current_user.role == 'admin':
@@ -168,6 +916,7 @@ def login():
     return render_template('login.html')
 
 @app.route('/login/student', methods=['GET', 'POST'])
+@query_budget(2)
 def student_login():
     if request.method == 'POST':
         reg_no = request.form.get('reg_no')
@@ -207,6 +956,7 @@ def student_login():
     return render_template('student_login.html')
 
 @app.route('/login/staff', methods=['GET', 'POST'])
+@query_budget(2)
 def staff_login():
     if request.method == 'POST':
         staff_id = request.form.get('staff_id')
@@ -330,6 +1080,7 @@ def logout():
     return redirect(url_for('login'))
 
 @app.route('/student/dashboard')
+@query_budget(2)
 @login_required
 def student_dashboard():
     if current_user.role != 'student':
@@ -338,14 +1089,19 @@ def student_dashboard():
     return render_template('student_dashboard.html', regulations=regulations)
 
 @app.route('/student/my_reviews')
+@query_budget(2)
 @login_required
 def student_my_reviews():
     if current_user.role != 'student':
         return redirect(url_for('index'))
-    reviews = Review.query.join(Regulation, Review.regulation_id == Regulation.id).join(Semester, Review.semester_id == Semester.id).join(Subject, Review.subject_id == Subject.id).filter(Review.student_id == current_user.id).order_by(Review.created_at.desc()).all()
+    # The template shows each review's regulation, semester and subject; fill them from the joins
+    reviews = Review.query.join(Regulation, Review.regulation_id == Regulation.id).join(Semester, Review.semester_id == Semester.id).join(Subject, Review.subject_id == Subject.id).options(
+        contains_eager(Review.regulation), contains_eager(Review.semester), contains_eager(Review.subject)
+    ).filter(Review.student_id == current_user.id).order_by(Review.created_at.desc()).all()
     return render_template('student_my_reviews.html', reviews=reviews)
 
 @app.route('/student/select/<int:regulation_id>', methods=['GET', 'POST'])
+@query_budget(2)
 @login_required
 def select_regulation(regulation_id):
     if current_user.role != 'student':
@@ -363,6 +1119,7 @@ def select_regulation(regulation_id):
     return render_template('select_semester.html', semesters=semesters, regulation_id=regulation_id)
 
 @app.route('/student/review/<int:regulation_id>/<semester_ids>', methods=['GET', 'POST'])
+@query_budget(10)
 @login_required
 def student_review(regulation_id, semester_ids):
     if current_user.role != 'student':
@@ -409,26 +1166,14 @@ def student_review(regulation_id, semester_ids):
             elif action == 'submit':
                 # Save all to DB
                 try:
+                    entries = []
                     for sem_id_str, sem_reviews in reviews_data.items():
                         sem_id = int(sem_id_str)
                         for subj_id_str, data in sem_reviews.items():
-                            subj_id = int(subj_id_str)
-                            review = Review(
-                                student_id=current_user.id,
-                                regulation_id=regulation_id,
-                                semester_id=sem_id,
-                                subject_id=subj_id,
-                                feedback=data['comment'] or 'submitted',
-                                teaching=data['teaching'],
-                                course_content=data['course_content'],
-                                examination=data['examination'],
-                                lab_support=data['lab_support'],
-                                teaching_method=data['teaching_method'],
-                                library_support=data['library_support'],
-                                comment=data['comment']
-                            )
-                            db.session.add(review)
+                            entries.append(dict(data, semester_id=sem_id, subject_id=int(subj_id_str)))
+                    save_reviews(current_user.id, regulation_id, entries)
                     db.session.commit()
+                    notify_review_listeners()
                     session.pop('reviews_data', None)
                     flash('Reviews submitted successfully.')
                     return redirect(url_for('student_dashboard'))
@@ -439,78 +1184,142 @@ def student_review(regulation_id, semester_ids):
                     return redirect(url_for('student_review', regulation_id=regulation_id, semester_ids=semester_ids, step=step))
     return render_template('student_review.html', semesters=semesters, current_sem=current_sem, subjects=subjects, step=step, total_steps=len(semesters), semester_ids=semester_ids, regulation_id=regulation_id)
 
+@app.route('/api/student/reviews', methods=['POST'])
+@query_budget(10)
+@login_required
+def api_submit_reviews():
+    """
+    Submit a whole multi-semester review set in one request
+    Body: {"regulation_id": int, "reviews": [{"subject_id": int, "teaching": str, ...,
+    "library_support": str, "comment": str or null}, ...]}
+    """
+    if current_user.role != 'student':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    payload = request.get_json(silent=True) or {}
+    regulation_id = payload.get('regulation_id')
+    reviews = payload.get('reviews')
+    if not isinstance(regulation_id, int) or not isinstance(reviews, list) or not reviews:
+        return jsonify({'error': 'regulation_id and a non-empty reviews list are required'}), 400
+    if len(reviews) > REVIEW_BATCH_LIMIT:
+        return jsonify({'error': f'At most {REVIEW_BATCH_LIMIT} reviews per request'}), 400
+    
+    subject_ids = []
+    for review in reviews:
+        if not isinstance(review, dict) or not isinstance(review.get('subject_id'), int):
+            return jsonify({'error': 'Every review needs an integer subject_id'}), 400
+        if not all(isinstance(review.get(field), str) and review[field].strip() for field in RATING_FIELDS):
+            return jsonify({'error': f'Please fill all ratings for subject {review["subject_id"]}'}), 400
+        if review.get('comment') is not None and not isinstance(review['comment'], str):
+            return jsonify({'error': f'Comment for subject {review["subject_id"]} must be text'}), 400
+        subject_ids.append(review['subject_id'])
+    if len(set(subject_ids)) != len(subject_ids):
+        return jsonify({'error': 'Each subject can only be reviewed once per request'}), 400
+    
+    # Check every subject against the regulation's catalog in one query
+    subject_semesters = dict(
+        db.session.query(Subject.id, Subject.semester_id)
+        .join(Semester, Subject.semester_id == Semester.id)
+        .filter(Subject.id.in_(subject_ids), Semester.regulation_id == regulation_id)
+        .all()
+    )
+    unknown = [subject_id for subject_id in subject_ids if subject_id not in subject_semesters]
+    if unknown:
+        return jsonify({'error': 'Subjects not found in this regulation', 'subject_ids': unknown}), 400
+    
+    try:
+        created = save_reviews(current_user.id, regulation_id, [
+            dict(review, semester_id=subject_semesters[review['subject_id']]) for review in reviews
+        ])
+        db.session.commit()
+        notify_review_listeners()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Review batch submission error: {e}")
+        return jsonify({'error': 'Failed to submit reviews'}), 500
+    
+    return jsonify({'status': 'success', 'created': created}), 201
+
 @app.route('/admin/dashboard')
+@query_budget(4)
 def admin_dash():
     if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
         return redirect(url_for('login'))
     regulations = Regulation.query.all()
     semesters = Semester.query.all()
+    subjects = Subject.query.all()
     students = User.query.filter_by(role='student').all()
-    return render_template('admin_dashboard.html', regulations=regulations, semesters=semesters, students=students)
+    return render_template('admin_dashboard.html', regulations=regulations, semesters=semesters,
+                           subjects=subjects, students=students)
 
 @app.route('/admin/export_csv')
+@query_budget(2)
 def admin_export_csv():
     if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
         return redirect(url_for('login'))
-    regulation_id = request.args.get('regulation_id')
-    semester_id = request.args.get('semester_id')
-    student_id = request.args.get('student_id')
-
-    # Normalize filters: treat '', None, 'all', 'All', 'undefined', 'null' as not provided
-    def normalize_id(val):
-        if val is None:
-            return None
-        sval = str(val).strip().lower()
-        if sval in ('', 'all', 'undefined', 'null', 'none'):
-            return None
-        try:
-            return int(val)
-        except (TypeError, ValueError):
-            return None
-
-    regulation_id_norm = normalize_id(regulation_id)
-    semester_id_norm = normalize_id(semester_id)
-    student_id_norm = normalize_id(student_id)
-    
-    query = Review.query.join(Regulation, Review.regulation_id == Regulation.id).join(Semester, Review.semester_id == Semester.id).join(Subject, Review.subject_id == Subject.id).join(User, Review.student_id == User.id)
-    if regulation_id_norm is not None:
-        query = query.filter(Review.regulation_id == regulation_id_norm)
-    if semester_id_norm is not None:
-        query = query.filter(Review.semester_id == semester_id_norm)
-    if student_id_norm is not None:
-        query = query.filter(Review.student_id == student_id_norm)
-    reviews = query.order_by(Review.created_at).all()
+    # The export streams as it is written; as a job it would be held whole in one row
+    if async_requested():
+        return jsonify({'error': 'The CSV export streams as it is generated; request it without async'}), 400
+    # Regulation, semester, subject, student and date filters, as the analytics take them
+    try:
+        filters = parse_analytics_filters()
+    except ValueError as e:
+        flash(str(e))
+        return redirect(url_for('admin_dash'))
+    
+    # Select the joined columns directly so no row triggers a lazy load
+    query = db.session.query(
+        User.full_name,
+        User.reg_no,
+        Regulation.code,
+        Semester.name,
+        Subject.course_code,
+        Subject.course_name,
+        Review.teaching,
+        Review.course_content,
+        Review.examination,
+        Review.lab_support,
+        Review.teaching_method,
+        Review.library_support,
+        Review.feedback,
+        Review.comment,
+        Review.created_at
+    ).select_from(Review).join(Regulation, Review.regulation_id == Regulation.id).join(Semester, Review.semester_id == Semester.id).join(Subject, Review.subject_id == Subject.id).join(User, Review.student_id == User.id)
+    query = query.filter(*review_filter_criteria(filters))
+    # Server-side cursor: rows are fetched in chunks while the response streams
+    rows = query.order_by(Review.created_at).yield_per(CSV_EXPORT_CHUNK_SIZE)
     
     import csv
     from io import StringIO
-    si = StringIO()
-    writer = csv.writer(si)
-    writer.writerow(['Student Name', 'Student Reg No', 'Regulation', 'Semester', 'Subject Code', 'Subject Name', 'Teaching', 'Course Content', 'Examination', 'Lab Support', 'Teaching Method', 'Library Support', 'Feedback', 'Comment', 'Date'])
-    for review in reviews:
-        writer.writerow([
-            review.student.full_name,
-            review.student.reg_no,
-            review.regulation.code,
-            review.semester.name,
-            review.subject.course_code,
-            review.subject.course_name,
-            review.teaching,
-            review.course_content,
-            review.examination,
-            review.lab_support,
-            review.teaching_method,
-            review.library_support,
-            review.feedback,
-            review.comment,
-            review.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        ])
-    output = si.getvalue()
-    si.close()
-    from flask import Response
-    return Response(output, mimetype='text/csv', headers={'Content-Disposition': 'attachment; filename=filtered_reviews.csv'})
+    from flask import Response, stream_with_context
+    
+    def generate():
+        si = StringIO()
+        writer = csv.writer(si)
+        writer.writerow(['Student Name', 'Student Reg No', 'Regulation', 'Semester', 'Subject Code', 'Subject Name', 'Teaching', 'Course Content', 'Examination', 'Lab Support', 'Teaching Method', 'Library Support', 'Feedback', 'Comment', 'Date'])
+        yield si.getvalue()
+        si.seek(0)
+        si.truncate(0)
+        
+        count = 0
+        for count, row in enumerate(rows, 1):
+            created_at = row[-1]
+            writer.writerow(list(row[:-1]) + [created_at.strftime('%Y-%m-%d %H:%M:%S') if created_at else ''])
+            if count % CSV_EXPORT_CHUNK_SIZE == 0:
+                yield si.getvalue()
+                si.seek(0)
+                si.truncate(0)
+        
+        yield si.getvalue()
+        si.close()
+        record_reviews_scanned(count)
+    
+    return Response(stream_with_context(generate()), mimetype='text/csv', headers={'Content-Disposition': 'attachment; filename=filtered_reviews.csv'})
 
 # Analytics API Routes
 @app.route('/api/analytics/overview')
+@query_budget(6)
+@conditional_analytics
 def api_analytics_overview():
     """Get overall analytics overview"""
     if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
@@ -519,28 +1328,34 @@ def api_analytics_overview():
     if not PREPROCESSING_AVAILABLE:
         return jsonify({'error': 'Analytics module not available'}), 503
     
-    processor = ReviewDataProcessor()
-    
-    # Get all reviews
-    reviews = Review.query.all()
+    try:
+        filters = parse_analytics_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Calculate statistics
-    stats = get_review_statistics(reviews)
+    # Ratings, sentiment and the review count come from the rollups
+    totals = rollup_aggregates(filters=filters)
+    averages = totals['average_ratings']
+    sentiment_dist = totals['sentiment_distribution']
+    overall_satisfaction = round(sum(averages.values()) / len(averages), 2) if averages else 0
     
     # Get counts
+    total_reviews = totals['count']
     total_students = User.query.filter_by(role='student').count()
     total_subjects = Subject.query.count()
     
     return jsonify({
-        'total_reviews': stats['total_reviews'],
+        'total_reviews': total_reviews,
         'total_students': total_students,
         'total_subjects': total_subjects,
-        'average_ratings': stats['average_ratings'],
-        'sentiment_distribution': stats['sentiment_distribution'],
-        'overall_satisfaction': stats['overall_satisfaction']
+        'average_ratings': averages,
+        'sentiment_distribution': sentiment_dist,
+        'overall_satisfaction': overall_satisfaction
     })
 
 @app.route('/api/analytics/sentiment-distribution')
+@query_budget(4)
+@conditional_analytics
 def api_sentiment_distribution():
     """Get sentiment distribution data"""
     if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
@@ -549,14 +1364,18 @@ def api_sentiment_distribution():
     if not PREPROCESSING_AVAILABLE:
         return jsonify({'error': 'Analytics module not available'}), 503
     
-    processor = ReviewDataProcessor()
-    reviews = Review.query.all()
+    try:
+        filters = parse_analytics_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    sentiment_dist = processor.get_sentiment_distribution(reviews)
+    sentiment_dist = rollup_aggregates(filters=filters)['sentiment_distribution']
     
     return jsonify(sentiment_dist)
 
 @app.route('/api/analytics/ratings-distribution')
+@query_budget(4)
+@conditional_analytics
 def api_ratings_distribution():
     """Get ratings distribution for all categories"""
     if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
@@ -565,18 +1384,18 @@ def api_ratings_distribution():
     if not PREPROCESSING_AVAILABLE:
         return jsonify({'error': 'Analytics module not available'}), 503
     
-    processor = ReviewDataProcessor()
-    reviews = Review.query.all()
+    try:
+        filters = parse_analytics_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    categories = ['teaching', 'course_content', 'examination', 'lab_support', 'teaching_method', 'library_support']
-    
-    distributions = {}
-    for category in categories:
-        distributions[category] = processor.get_rating_distribution(reviews, category)
+    distributions = rollup_aggregates(filters=filters)['rating_distribution']
     
     return jsonify(distributions)
 
 @app.route('/api/analytics/average-ratings')
+@query_budget(4)
+@conditional_analytics
 def api_average_ratings():
     """Get average ratings for each category"""
     if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
@@ -585,14 +1404,18 @@ def api_average_ratings():
     if not PREPROCESSING_AVAILABLE:
         return jsonify({'error': 'Analytics module not available'}), 503
     
-    processor = ReviewDataProcessor()
-    reviews = Review.query.all()
+    try:
+        filters = parse_analytics_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    averages = processor.calculate_average_ratings(reviews)
+    averages = rollup_aggregates(filters=filters)['average_ratings']
     
     return jsonify(averages)
 
 @app.route('/api/analytics/semester-wise')
+@query_budget(5)
+@conditional_analytics
 def api_semester_wise():
     """Get semester-wise analytics"""
     if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
@@ -601,27 +1424,34 @@ def api_semester_wise():
     if not PREPROCESSING_AVAILABLE:
         return jsonify({'error': 'Analytics module not available'}), 503
     
-    processor = ReviewDataProcessor()
+    try:
+        filters = parse_analytics_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     semesters = Semester.query.all()
     
+    # One grouped query over the rollups, whatever the number of reviews
+    groups = grouped_rollup_aggregates(ReviewRollup.semester_id, filters=filters)
+    
     semester_data = []
     for semester in semesters:
-        reviews = Review.query.filter_by(semester_id=semester.id).all()
-        if reviews:
-            averages = processor.calculate_average_ratings(reviews)
-            sentiment_dist = processor.get_sentiment_distribution(reviews)
-            
+        group = groups.get(semester.id)
+        if group:
             semester_data.append({
                 'semester_name': semester.name,
                 'semester_id': semester.id,
-                'total_reviews': len(reviews),
-                'average_ratings': averages,
-                'sentiment_distribution': sentiment_dist
+                'total_reviews': group['count'],
+                'average_ratings': group['average_ratings'],
+                'sentiment_distribution': group['sentiment_distribution']
             })
     
     return jsonify(semester_data)
 
 @app.route('/api/analytics/subject-wise')
+@query_budget(5)
+@background_job
+@conditional_analytics
 def api_subject_wise():
     """Get subject-wise analytics"""
     if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
@@ -630,82 +1460,100 @@ def api_subject_wise():
     if not PREPROCESSING_AVAILABLE:
         return jsonify({'error': 'Analytics module not available'}), 503
     
-    processor = ReviewDataProcessor()
+    try:
+        filters = parse_analytics_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     # Get top 10 subjects by review count
-    subject_reviews = db.session.query(
-        Subject.course_name,
-        Subject.course_code,
-        func.count(Review.id).label('review_count')
-    ).join(Review, Review.subject_id == Subject.id).group_by(Subject.id).order_by(func.count(Review.id).desc()).limit(10).all()
+    groups = grouped_rollup_aggregates(ReviewRollup.subject_id, filters=filters)
+    top_subjects = sorted(groups.items(), key=lambda item: item[1]['count'], reverse=True)[:10]
+    subjects = {subject.id: subject for subject in Subject.query.filter(Subject.id.in_([subject_id for subject_id, _ in top_subjects]))}
     
     subject_data = []
-    for subject_name, subject_code, review_count in subject_reviews:
-        subject = Subject.query.filter_by(course_code=subject_code).first()
-        reviews = Review.query.filter_by(subject_id=subject.id).all()
-        
-        averages = processor.calculate_average_ratings(reviews)
-        sentiment_dist = processor.get_sentiment_distribution(reviews)
+    for subject_id, group in top_subjects:
+        subject = subjects.get(subject_id)
+        if not subject:
+            continue
+        averages = group['average_ratings']
         
         # Calculate overall score
         overall_score = sum(averages.values()) / len(averages) if averages else 0
         
         subject_data.append({
-            'subject_name': subject_name,
-            'subject_code': subject_code,
-            'review_count': review_count,
+            'subject_name': subject.course_name,
+            'subject_code': subject.course_code,
+            'review_count': group['count'],
             'average_ratings': averages,
-            'sentiment_distribution': sentiment_dist,
+            'sentiment_distribution': group['sentiment_distribution'],
             'overall_score': round(overall_score, 2)
         })
     
     return jsonify(subject_data)
 
 @app.route('/api/analytics/time-trends')
+@query_budget(4)
+@conditional_analytics
 def api_time_trends():
-    """Get sentiment trends over time"""
+    """
+    Get sentiment trends over time
+    Query parameters: the analytics filters (see parse_analytics_filters),
+    granularity (day, week or month; default day) and window (buckets in the
+    rolling average). Weeks start on Monday; buckets cut by from / to only count
+    reviews inside the range
+    """
     if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
         return jsonify({'error': 'Unauthorized'}), 401
     
     if not PREPROCESSING_AVAILABLE:
         return jsonify({'error': 'Analytics module not available'}), 503
     
-    processor = ReviewDataProcessor()
-    reviews = Review.query.order_by(Review.created_at).all()
+    try:
+        filters = parse_analytics_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    time_data = processor.get_time_series_data(reviews)
+    granularity = request.args.get('granularity', 'day').strip().lower() or 'day'
+    if granularity not in TREND_GRANULARITIES:
+        return jsonify({'error': f"'granularity' must be one of {', '.join(TREND_GRANULARITIES)}"}), 400
+    window = request.args.get('window', '').strip()
+    if window and (not window.isdigit() or int(window) < 1):
+        return jsonify({'error': "'window' must be a positive integer"}), 400
+    window = int(window) if window else TREND_ROLLING_WINDOW[granularity]
     
-    # Group by date using happy/neutral/bad
-    from collections import defaultdict
-    date_groups = defaultdict(lambda: {'happy': 0, 'neutral': 0, 'bad': 0, 'count': 0, 'polarity_sum': 0.0})
+    # Sentiment counts and polarity come straight from the rollups, bucketed
+    # in the database; the index on ReviewRollup.day limits the rows read to the from / to range
+    groups = grouped_rollup_aggregates(
+        date_bucket(ReviewRollup.day, granularity),
+        ReviewRollup.day.isnot(None),
+        filters=filters,
+        key=lambda key: bucket_start(key[3], granularity) if key[3] else None
+    )
     
-    for item in time_data:
-        date = item['date']
-        sentiment = item['sentiment']
-        polarity = item['polarity']
-        
-        if sentiment not in ('happy', 'neutral', 'bad'):
-            sentiment = 'neutral'
-        date_groups[date][sentiment] += 1
-        date_groups[date]['count'] += 1
-        date_groups[date]['polarity_sum'] += polarity
+    # SQLite returns computed dates as strings
+    buckets = sorted(
+        (datetime.strptime(day, '%Y-%m-%d').date() if isinstance(day, str) else day, group)
+        for day, group in groups.items()
+    )
+    rolling = rolling_average_polarity(buckets, granularity, window)
     
-    # Format for chart: { date, counts: { happy, neutral, bad }, average_polarity }
+    # Format for chart: { date, count, counts: { happy, neutral, bad }, average_polarity, rolling_average_polarity }
     trend_data = []
-    for date, data in sorted(date_groups.items()):
+    for (day, group), rolling_polarity in zip(buckets, rolling):
         trend_data.append({
-            'date': date,
-            'counts': {
-                'happy': data['happy'],
-                'neutral': data['neutral'],
-                'bad': data['bad']
-            },
-            'average_polarity': round(data['polarity_sum'] / data['count'], 3) if data['count'] > 0 else 0
+            'date': day.strftime('%Y-%m-%d'),
+            'count': group['count'],
+            'counts': group['sentiment_distribution'],
+            'average_polarity': group['average_polarity'],
+            'rolling_average_polarity': rolling_polarity
         })
     
     return jsonify(trend_data)
 
 @app.route('/api/analytics/common-themes')
+@query_budget(5)
+@background_job
+@conditional_analytics
 def api_common_themes():
     """Get common themes/keywords from reviews"""
     if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
@@ -714,8 +1562,14 @@ def api_common_themes():
     if not PREPROCESSING_AVAILABLE:
         return jsonify({'error': 'Analytics module not available'}), 503
     
-    processor = ReviewDataProcessor()
-    reviews = Review.query.all()
+    try:
+        filters = parse_analytics_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    processor = get_processor()
+    reviews = Review.query.filter(*review_filter_criteria(filters)).all()
+    record_reviews_scanned(len(reviews))
     
     themes = processor.extract_common_themes(reviews, top_n=20)
     
@@ -725,6 +1579,9 @@ def api_common_themes():
     return jsonify(theme_data)
 
 @app.route('/api/analytics/regulation-wise')
+@query_budget(6)
+@background_job
+@conditional_analytics
 def api_regulation_wise():
     """Get regulation-wise sentiment analysis"""
     if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
@@ -733,31 +1590,34 @@ def api_regulation_wise():
     if not PREPROCESSING_AVAILABLE:
         return jsonify({'error': 'Analytics module not available'}), 503
     
-    processor = ReviewDataProcessor()
+    try:
+        filters = parse_analytics_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     regulations = Regulation.query.all()
     
+    # Reviews are grouped under their semester's regulation
+    groups = grouped_rollup_aggregates(Semester.regulation_id, filters=filters)
+    
     regulation_data = []
     for regulation in regulations:
-        reviews = Review.query.join(Subject).join(Semester).filter(
-            Semester.regulation_id == regulation.id
-        ).all()
-        
-        if reviews:
-            sentiment_dist = processor.get_sentiment_distribution(reviews)
-            averages = processor.calculate_average_ratings(reviews)
-            
+        group = groups.get(regulation.id)
+        if group:
             regulation_data.append({
                 'regulation_code': regulation.code,
                 'regulation_title': regulation.title,
                 'regulation_id': regulation.id,
-                'total_reviews': len(reviews),
-                'sentiment_distribution': sentiment_dist,
-                'average_ratings': averages
+                'total_reviews': group['count'],
+                'sentiment_distribution': group['sentiment_distribution'],
+                'average_ratings': group['average_ratings']
             })
     
     return jsonify(regulation_data)
 
 @app.route('/api/analytics/overall-sentiment')
+@query_budget(4)
+@conditional_analytics
 def api_overall_sentiment():
     """Get overall sentiment distribution with pie chart data"""
     if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
@@ -766,16 +1626,241 @@ def api_overall_sentiment():
     if not PREPROCESSING_AVAILABLE:
         return jsonify({'error': 'Analytics module not available'}), 503
     
-    processor = ReviewDataProcessor()
-    reviews = Review.query.all()
+    try:
+        filters = parse_analytics_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    sentiment_dist = processor.get_sentiment_distribution(reviews)
+    totals = rollup_aggregates(filters=filters)
     
     return jsonify({
-        'sentiment_distribution': sentiment_dist,
-        'total_reviews': len(reviews)
+        'sentiment_distribution': totals['sentiment_distribution'],
+        'total_reviews': totals['count']
+    })
+
+@app.route('/api/analytics/dashboard')
+@query_budget(12)
+@conditional_analytics
+def api_analytics_dashboard():
+    """Get the data for every dashboard panel from the review snapshot (or a single pass over the reviews without NumPy)"""
+    if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if not PREPROCESSING_AVAILABLE:
+        return jsonify({'error': 'Analytics module not available'}), 503
+    
+    try:
+        filters = parse_analytics_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    processor = get_processor()
+    semesters = Semester.query.all()
+    subjects = {subject.id: subject for subject in Subject.query.all()}
+    regulations = Regulation.query.all()
+    semester_regulations = {semester.id: semester.regulation_id for semester in semesters}
+    
+    # Reviews above this id reach the page through /api/analytics/stream
+    last_review_id = db.session.query(func.max(Review.id)).scalar() or 0
+    snapshot = refresh_review_snapshot()
+    if snapshot is not None:
+        # Groups come from the columnar snapshot; only the theme text is read from the table.
+        # Hold the lock so a concurrent refresh cannot grow the arrays under the mask
+        with snapshot.lock:
+            mask = snapshot.mask(filters.regulation_id, filters.semester_id, filters.subject_id,
+                                 filters.student_id, filters.start, filters.end)
+            data = snapshot.get_dashboard_data(mask, semester_regulations)
+            last_review_id = snapshot.last_id
+        theme_rows = db.session.query(Review.comment, Review.feedback, *(getattr(Review, field) for field in RATING_FIELDS))\
+            .filter(*review_filter_criteria(filters)).all()
+        data['themes'] = processor.extract_common_themes(theme_rows, top_n=20)
+        record_reviews_scanned(len(theme_rows))
+    else:
+        reviews = Review.query.filter(*review_filter_criteria(filters)).all()
+        data = processor.get_dashboard_data(reviews, semester_regulations=semester_regulations)
+        record_reviews_scanned(len(reviews))
+    
+    overall = data['overall']
+    averages = processor.group_averages(overall)
+    overall_satisfaction = round(sum(averages.values()) / len(averages), 2) if averages else 0
+    
+    semester_data = []
+    for semester in semesters:
+        group = data['by_semester'].get(semester.id)
+        if group:
+            semester_data.append({
+                'semester_name': semester.name,
+                'semester_id': semester.id,
+                'total_reviews': group['count'],
+                'average_ratings': processor.group_averages(group),
+                'sentiment_distribution': group['sentiment_distribution']
+            })
+    
+    # Top 10 subjects by review count
+    top_subjects = sorted(data['by_subject'].items(), key=lambda item: item[1]['count'], reverse=True)[:10]
+    subject_data = []
+    for subject_id, group in top_subjects:
+        subject = subjects.get(subject_id)
+        if not subject:
+            continue
+        subject_averages = processor.group_averages(group)
+        subject_data.append({
+            'subject_name': subject.course_name,
+            'subject_code': subject.course_code,
+            'review_count': group['count'],
+            'average_ratings': subject_averages,
+            'sentiment_distribution': group['sentiment_distribution'],
+            'overall_score': round(sum(subject_averages.values()) / len(subject_averages), 2)
+        })
+    
+    regulation_data = []
+    for regulation in regulations:
+        group = data['by_regulation'].get(regulation.id)
+        if group:
+            regulation_data.append({
+                'regulation_code': regulation.code,
+                'regulation_title': regulation.title,
+                'regulation_id': regulation.id,
+                'total_reviews': group['count'],
+                'sentiment_distribution': group['sentiment_distribution'],
+                'average_ratings': processor.group_averages(group)
+            })
+    
+    trend_data = []
+    for date, group in sorted(data['by_date'].items()):
+        trend_data.append({
+            'date': date,
+            'counts': group['sentiment_distribution'],
+            'average_polarity': round(group['polarity_sum'] / group['count'], 3) if group['count'] > 0 else 0
+        })
+    
+    return jsonify({
+        'overview': {
+            'total_reviews': overall['count'],
+            'total_students': User.query.filter_by(role='student').count(),
+            'total_subjects': len(subjects),
+            'average_ratings': averages,
+            'sentiment_distribution': overall['sentiment_distribution'],
+            'overall_satisfaction': overall_satisfaction
+        },
+        'subject_wise': subject_data,
+        'ratings_distribution': overall['rating_distribution'],
+        'overall_sentiment': {
+            'sentiment_distribution': overall['sentiment_distribution'],
+            'total_reviews': overall['count']
+        },
+        'semester_wise': semester_data,
+        'regulation_wise': regulation_data,
+        'common_themes': [{'word': word, 'count': count} for word, count in data['themes']],
+        'time_trends': trend_data,
+        'last_review_id': last_review_id
     })
 
+@app.route('/api/analytics/stream')
+def api_analytics_stream():
+    """
+    Server-Sent Events with dashboard deltas (see analytics_delta) for reviews
+    committed after last_id, matching the analytics filters
+    Query parameters: the analytics filters and last_id (the dashboard's
+    last_review_id); a reconnecting browser's Last-Event-ID takes precedence.
+    With ANALYTICS_STREAM_SECONDS set, the stream stays open that long:
+    submissions in this process wake it at once, others are picked up within
+    ANALYTICS_STREAM_POLL_SECONDS. Otherwise it checks once and closes, and the
+    browser reconnects after ANALYTICS_STREAM_RECONNECT_SECONDS
+    """
+    if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if not PREPROCESSING_AVAILABLE:
+        return jsonify({'error': 'Analytics module not available'}), 503
+    
+    try:
+        filters = parse_analytics_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    if last_id and not last_id.isdigit():
+        return jsonify({'error': "'last_id' must be a review id"}), 400
+    last_id = int(last_id) if last_id else None
+    
+    from flask import Response, stream_with_context
+    
+    def generate():
+        latest_id = last_id
+        if latest_id is None:
+            latest_id = db.session.query(func.max(Review.id)).scalar() or 0
+        long_lived = ANALYTICS_STREAM_SECONDS > 0
+        reconnect_seconds = ANALYTICS_STREAM_POLL_SECONDS if long_lived else ANALYTICS_STREAM_RECONNECT_SECONDS
+        yield f'retry: {reconnect_seconds * 1000}\n\n'
+        
+        deadline = time.monotonic() + ANALYTICS_STREAM_SECONDS
+        while True:
+            # Cheap primary key lookup first; rows are only read when there are new ones
+            newest_id = db.session.query(func.max(Review.id)).scalar() or 0
+            if newest_id > latest_id:
+                rows = db.session.query(*snapshot_columns()).filter(
+                    Review.id > latest_id,
+                    Review.id <= newest_id,
+                    *review_filter_criteria(filters)
+                ).order_by(Review.id).all()
+                latest_id = newest_id
+                if rows:
+                    yield f'id: {latest_id}\nevent: delta\ndata: {json.dumps(analytics_delta(rows))}\n\n'
+                else:
+                    # No matching rows: only move the browser's Last-Event-ID past them
+                    yield f'id: {latest_id}\n\n'
+            # Hand the pooled connection back while waiting
+            db.session.close()
+            if time.monotonic() >= deadline:
+                break
+            yield ': keepalive\n\n'
+            
+            with _review_listeners:
+                _review_listeners.wait(min(ANALYTICS_STREAM_POLL_SECONDS, max(deadline - time.monotonic(), 0)))
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# Background job API
+@app.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    """Status of a background analytics job, with result_url once it is done"""
+    if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    fail_stale_jobs()
+    db.session.commit()
+    job = db.session.get(AnalyticsJob, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(analytics_job_status(job))
+
+@app.route('/api/jobs/<job_id>/result')
+def api_job_result(job_id):
+    """Stored response of a finished background analytics job"""
+    if not session.get('admin') and (not current_user.is_authenticated or current_user.role != 'admin'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    job = db.session.get(AnalyticsJob, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status != 'done':
+        return jsonify(analytics_job_status(job)), 409
+    
+    return app.response_class(job.result, mimetype=job.mimetype)
+
+# Prometheus metrics (see metrics.py)
+@app.route('/metrics')
+def metrics_endpoint():
+    """Request, SQL, pool and analytics metrics of this process; METRICS_TOKEN, when set, is required as a bearer token"""
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Unauthorized'}), 401
+    return app.response_class(render_metrics(db.engine), mimetype='text/plain; version=0.0.4')
+
 # Health check endpoint
 @app.route('/health')
 def health_check():
@@ -0,0 +1,73 @@
+"""
+Backfill stored sentiment for existing reviews
+Adds the sentiment columns to the review table if they are missing,
+then scores every review that has no stored sentiment yet
+"""
+import sys
+from types import SimpleNamespace
+from sqlalchemy import inspect, func, bindparam
+from app import app, db, Review
+from preprocessing import get_processor, RATING_FIELDS
+
+SENTIMENT_COLUMNS = {
+    'sentiment_label': 'VARCHAR(10)',
+    'sentiment_polarity': 'FLOAT',
+    'sentiment_subjectivity': 'FLOAT'
+}
+
+def add_sentiment_columns():
+    """Add the sentiment columns to an existing review table"""
+    existing = {col['name'] for col in inspect(db.engine).get_columns('review')}
+    for name, col_type in SENTIMENT_COLUMNS.items():
+        if name not in existing:
+            print(f"Adding column review.{name}")
+            db.session.execute(db.text(f"ALTER TABLE review ADD COLUMN {name} {col_type} NULL"))
+    db.session.commit()
+
+def backfill_sentiment(batch_size=500):
+    """Score reviews without stored sentiment, committing every batch"""
+    with app.app_context():
+        add_sentiment_columns()
+        
+        processor = get_processor()
+        # Only the columns scored and written are read, so this also runs before
+        # the other upgrade scripts have added the columns the model has since
+        total = db.session.query(func.count(Review.id)).filter(Review.sentiment_label.is_(None)).scalar()
+        print(f"Reviews to score: {total}")
+        
+        table = Review.__table__
+        statement = table.update().where(table.c.id == bindparam('review_id')).values(
+            sentiment_label=bindparam('label'),
+            sentiment_polarity=bindparam('polarity'),
+            sentiment_subjectivity=bindparam('subjectivity')
+        )
+        columns = [Review.id, Review.comment] + [getattr(Review, field) for field in RATING_FIELDS]
+        
+        done = 0
+        last_id = 0
+        while True:
+            rows = db.session.query(*columns).filter(
+                Review.sentiment_label.is_(None),
+                Review.id > last_id
+            ).order_by(Review.id).limit(batch_size).all()
+            if not rows:
+                break
+            
+            reviews = [SimpleNamespace(id=row[0], comment=row[1], **dict(zip(RATING_FIELDS, row[2:]))) for row in rows]
+            processor.score_reviews(reviews)
+            db.session.execute(statement, [
+                {'review_id': review.id, 'label': review.sentiment_label,
+                 'polarity': review.sentiment_polarity, 'subjectivity': review.sentiment_subjectivity}
+                for review in reviews
+            ])
+            db.session.commit()
+            
+            last_id = rows[-1][0]
+            done += len(reviews)
+            print(f"  Scored {done}/{total} reviews...")
+        
+        print(f"\n✅ Backfill complete! {done} reviews scored.")
+
+if __name__ == '__main__':
+    batch = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    backfill_sentiment(batch)
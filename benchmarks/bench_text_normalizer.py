@@ -0,0 +1,114 @@
+"""
+Micro-benchmark for TextPreprocessor on the review text in sentiment_db.sql
+Compares the single-pass tokenizer against the previous multi-pass
+implementation and checks both produce the same output
+
+Usage: python benchmarks/bench_text_normalizer.py [sql_file] [repeat]
+"""
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+# Add parent directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from preprocessing import TextPreprocessor, STOPWORDS
+
+# Single-quoted SQL string literals, allowing '' and backslash escapes
+STRING_LITERAL = re.compile(r"'((?:[^'\\]|\\.|'')*)'")
+
+
+class LegacyTextPreprocessor:
+    """The previous implementation: four re.sub calls per text, string round trips"""
+    
+    def __init__(self):
+        self.stopwords = set(STOPWORDS)
+    
+    def clean_text(self, text):
+        if not text or text == 'submitted':
+            return ""
+        text = text.lower()
+        text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
+        text = re.sub(r'\S+@\S+', '', text)
+        text = re.sub(r'[^a-zA-Z\s]', '', text)
+        text = re.sub(r'\s+', ' ', text).strip()
+        return text
+    
+    def remove_stopwords(self, text):
+        words = text.split()
+        filtered_words = [word for word in words if word not in self.stopwords and len(word) > 2]
+        return ' '.join(filtered_words)
+    
+    def preprocess(self, text):
+        text = self.clean_text(text)
+        text = self.remove_stopwords(text)
+        return text
+    
+    def extract_keywords(self, text, top_n=10):
+        text = self.preprocess(text)
+        words = text.split()
+        word_freq = Counter(words)
+        return word_freq.most_common(top_n)
+
+
+def load_review_text(sql_file):
+    """Collect the string values from the review INSERT statements of a dump"""
+    texts = []
+    with open(sql_file, 'r', encoding='utf-8') as f:
+        in_review_insert = False
+        for line in f:
+            if line.startswith('INSERT INTO'):
+                in_review_insert = line.startswith(('INSERT INTO `review`', 'INSERT INTO `filtered_reviews'))
+                # Dumps with one INSERT per row keep the values on the same line
+                values = line.partition(' VALUES ')[2]
+                if in_review_insert and values:
+                    texts.extend(value.replace("''", "'").replace("\\'", "'") for value in STRING_LITERAL.findall(values))
+                continue
+            if in_review_insert and line.startswith('('):
+                texts.extend(value.replace("''", "'").replace("\\'", "'") for value in STRING_LITERAL.findall(line))
+            elif not line.strip():
+                in_review_insert = False
+    return texts
+
+
+def best_of(repeat, func, *args):
+    """Best wall time of several runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(sql_file, repeat=5):
+    texts = load_review_text(sql_file)
+    combined = ' '.join(texts)
+    legacy = LegacyTextPreprocessor()
+    current = TextPreprocessor()
+    
+    mismatches = sum(1 for text in texts if legacy.preprocess(text) != current.preprocess(text))
+    mismatches += sum(1 for text in texts if legacy.clean_text(text) != current.clean_text(text))
+    print(f"Texts: {len(texts)} ({len(combined)} characters), output mismatches: {mismatches}")
+    
+    cases = [
+        ('clean_text', lambda p: [p.clean_text(text) for text in texts]),
+        ('preprocess', lambda p: [p.preprocess(text) for text in texts]),
+        ('extract_keywords', lambda p: p.extract_keywords(combined, 20)),
+    ]
+    print(f"{'benchmark':<18}{'legacy (ms)':>14}{'current (ms)':>14}{'speedup':>10}")
+    for name, func in cases:
+        before = best_of(repeat, func, legacy)
+        after = best_of(repeat, func, current)
+        print(f"{name:<18}{before * 1000:>14.2f}{after * 1000:>14.2f}{before / after:>9.2f}x")
+
+
+if __name__ == '__main__':
+    sql_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(parent_dir, 'sentiment_db.sql')
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    run(sql_file, repeat)
@@ -0,0 +1,117 @@
+"""
+Check PolarityEngine and SentimentAnalyzer.analyze_many against TextBlob
+Scores the review text of the SQL dumps, synthetic comments built from them
+and hand-written negation / intensifier cases with TextBlob and with the
+engine (the NumPy batch path, the per-text path and analyze_many) and fails
+when a polarity or subjectivity differs by more than TOLERANCE, or when a
+happy/neutral/bad label differs.
+
+Usage: python benchmarks/check_polarity_parity.py [synthetic_count]   # default 20000
+Exits with status 1 on any mismatch
+"""
+import os
+import sys
+
+# Add parent directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from bench_text_normalizer import load_review_text
+from synthetic import ReviewDistribution
+from preprocessing import SentimentAnalyzer, TextPreprocessor, get_polarity_engine
+
+SQL_FILES = [os.path.join(parent_dir, name) for name in ('sentiment_db.sql', 'sentiment_db_export.sql')]
+
+# Largest allowed difference from TextBlob's polarity and subjectivity
+TOLERANCE = 1e-9
+
+# Negations, modifiers and how they combine, as pattern's rules treat them
+CASES = [
+    'good', 'not good', 'not bad', 'very good', 'very bad', 'really very good',
+    'not very good', 'very not good', 'really not bad at all', 'not a good class',
+    'not at all a good class', 'never helpful', "isn't good", "didn't like the lab, not useful",
+    'extremely boring but very very helpful', 'very', 'not', 'really is a good teacher',
+    'really the best', 'the teaching was not that great', 'no good examples',
+    'Excellent!!! Very, very clear.', 'quite poor library support', 'too slow and not clear',
+    'nothing', 'not not good', 'very really super amazing class', 'most helpful lab ever',
+    'good good bad bad', 'It was ok', 'submitted', '', 'http://example.com great', 'mail me@x.com bad',
+]
+
+
+def review_texts(synthetic_count):
+    """Dump texts, synthetic comments and the hand-written cases"""
+    texts = []
+    for sql_file in SQL_FILES:
+        if os.path.exists(sql_file):
+            texts.extend(load_review_text(sql_file))
+    if synthetic_count:
+        distribution = ReviewDistribution(SQL_FILES[0])
+        texts.extend(review['comment'] for review in distribution.generate(synthetic_count) if review['comment'])
+    texts.extend(CASES)
+    return texts
+
+
+def check_polarity_parity(synthetic_count=20000):
+    """Compare every scoring path with TextBlob; returns the number of mismatches"""
+    from textblob import TextBlob
+
+    texts = review_texts(synthetic_count)
+    preprocessor = TextPreprocessor()
+    engine = get_polarity_engine()
+
+    # The engine scores each distinct cleaned text; TextBlob is the reference
+    docs = {}
+    for text in texts:
+        tokens = preprocessor.tokenize(text)
+        docs.setdefault(' '.join(tokens), tokens)
+    cleaned = list(docs)
+    tokens = [docs[text] for text in cleaned]
+    expected = [tuple(TextBlob(text).sentiment) if text else (0.0, 0.0) for text in cleaned]
+
+    paths = [
+        ('score', engine.score(tokens), range(len(cleaned))),
+        ('score_tokens', [engine.score_tokens(doc) for doc in tokens], range(len(cleaned))),
+    ]
+    if engine.np is not None:
+        simple = [index for index, doc in enumerate(tokens) if engine.negations.isdisjoint(doc)]
+        paths.append(('score_batch', engine.score_batch([tokens[index] for index in simple]), simple))
+    else:
+        print("NumPy is not installed: score_batch is not checked")
+
+    mismatches = 0
+    for name, scores, indexes in paths:
+        worst = 0.0
+        failed = 0
+        for index, (polarity, subjectivity) in zip(indexes, scores):
+            want_polarity, want_subjectivity = expected[index]
+            diff = max(abs(polarity - want_polarity), abs(subjectivity - want_subjectivity))
+            worst = max(worst, diff)
+            if diff > TOLERANCE:
+                failed += 1
+                if failed <= 10:
+                    print(f"      {name}: {cleaned[index]!r}: {(polarity, subjectivity)} != {(want_polarity, want_subjectivity)}")
+        print(f"{'❌' if failed else '✅'} {name}: {len(indexes)} texts, {failed} mismatches, largest difference {worst:.2e}")
+        mismatches += failed
+
+    # analyze_many must label and round exactly like analyze_sentiment
+    batch = SentimentAnalyzer(cache_size=0).analyze_many(texts)
+    single = SentimentAnalyzer(cache_size=0)
+    failed = 0
+    for text, result in zip(texts, batch):
+        want = single.analyze_sentiment(text)
+        if result['label'] != want['label'] or abs(result['polarity'] - want['polarity']) > 0.001 \
+                or abs(result['subjectivity'] - want['subjectivity']) > 0.001:
+            failed += 1
+            if failed <= 10:
+                print(f"      analyze_many: {text!r}: {result} != {want}")
+    print(f"{'❌' if failed else '✅'} analyze_many: {len(texts)} texts, {failed} mismatches")
+    mismatches += failed
+
+    print(f"\n{mismatches} mismatch(es) with TextBlob")
+    return mismatches
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    sys.exit(1 if check_polarity_parity(count) else 0)
@@ -0,0 +1,144 @@
+"""
+SQLite-backed app fixture for the benchmarks
+Builds a database with the catalog from sentiment_db.sql plus any number of
+synthetic reviews (with stored sentiment and rollups, as the app writes them)
+and points the Flask app at it. Databases are cached in benchmarks/.data
+"""
+import os
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+# Add parent directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from sqlalchemy import insert, inspect
+from preprocessing import get_processor
+from synthetic import ReviewDistribution
+
+DATA_DIR = os.path.join(current_dir, '.data')
+DEFAULT_SQL_FILE = os.path.join(parent_dir, 'sentiment_db.sql')
+
+# Reviews generated, scored and inserted per batch while building
+BUILD_CHUNK_SIZE = 5000
+
+
+def database_path(size, seed=0):
+    """Cache location of the database with size synthetic reviews"""
+    return os.path.join(DATA_DIR, f'reviews_{size}_seed{seed}.db')
+
+
+def load_app(db_path):
+    """
+    Import the Flask app bound to the SQLite database at db_path
+    The app reads DATABASE_URI at import time, so this works once per process
+    """
+    uri = 'sqlite:///' + db_path
+    os.environ['DATABASE_URI'] = uri
+    import app as app_module
+    if app_module.app.config['SQLALCHEMY_DATABASE_URI'] != uri:
+        raise RuntimeError('app was already imported with another database')
+    return app_module
+
+
+def copy_table(db, table, columns, rows):
+    """Insert dump rows into a table, parsing DATETIME strings for SQLite"""
+    table = db.metadata.tables[table]
+    datetime_columns = [column for column in columns if isinstance(table.c[column].type, db.DateTime)]
+    records = []
+    for row in rows:
+        record = dict(zip(columns, row))
+        for column in datetime_columns:
+            if isinstance(record[column], str):
+                record[column] = datetime.strptime(record[column], '%Y-%m-%d %H:%M:%S')
+        records.append(record)
+    if records:
+        db.session.execute(table.insert(), records)
+
+
+def build_database(app_module, size, seed=0, sql_file=DEFAULT_SQL_FILE):
+    """Create the schema, copy the catalog and insert size synthetic reviews"""
+    app, db = app_module.app, app_module.db
+    distribution = ReviewDistribution(sql_file)
+    processor = get_processor()
+
+    with app.app_context():
+        db.create_all()
+        for table, (columns, rows) in distribution.catalog.items():
+            copy_table(db, table, columns, rows)
+
+        totals = {}
+        chunk = []
+        for review in distribution.generate(size, seed):
+            chunk.append(SimpleNamespace(**review))
+            if len(chunk) == BUILD_CHUNK_SIZE:
+                insert_chunk(app_module, processor, chunk, totals)
+                chunk = []
+        if chunk:
+            insert_chunk(app_module, processor, chunk, totals)
+
+        db.session.execute(insert(app_module.ReviewRollup), [
+            dict(zip(app_module.ROLLUP_KEY, key), **values) for key, values in totals.items()
+        ])
+        db.session.commit()
+
+
+def insert_chunk(app_module, processor, records, totals):
+    """Score a chunk of synthetic reviews, add it to the rollup totals and insert it"""
+    processor.score_reviews(records)
+    processor.encode_ratings(records)
+    processor.rollup_totals(records, totals)
+    app_module.db.session.execute(insert(app_module.Review), [vars(record) for record in records])
+    app_module.db.session.commit()
+
+
+def schema_is_current(app_module):
+    """Whether the database has every table and column the models declare"""
+    with app_module.app.app_context():
+        inspector = inspect(app_module.db.engine)
+        tables = set(inspector.get_table_names())
+        for table in app_module.db.metadata.sorted_tables:
+            if table.name not in tables:
+                return False
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            if any(column.name not in existing for column in table.columns):
+                return False
+    return True
+
+
+def open_database(size, seed=0, sql_file=DEFAULT_SQL_FILE):
+    """
+    Load the app on the cached database for size reviews, building it first if needed
+    Returns the app module
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = database_path(size, seed)
+    # Marker present while building, so an interrupted build is not reused
+    marker = path + '.building'
+    if os.path.exists(marker) and os.path.exists(path):
+        os.remove(path)
+    needs_build = not os.path.exists(path)
+
+    app_module = load_app(path)
+    if not needs_build and not schema_is_current(app_module):
+        # Built before the models changed
+        with app_module.app.app_context():
+            app_module.db.engine.dispose()
+        os.remove(path)
+        needs_build = True
+    if needs_build:
+        open(marker, 'w').close()
+        print(f"Building {path} with {size} synthetic reviews...")
+        build_database(app_module, size, seed, sql_file)
+        os.remove(marker)
+    return app_module
+
+
+def admin_client(app):
+    """Test client with an admin session"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['admin'] = True
+    return client
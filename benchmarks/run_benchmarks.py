@@ -0,0 +1,214 @@
+"""
+Benchmark suite for the preprocessing hot paths and the analytics endpoints
+Times clean_text, analyze_sentiment, get_review_statistics, the
+ReviewSnapshot dashboard groups, every /api/analytics/* route and the CSV
+export against SQLite databases of synthetic reviews (see synthetic.py and
+fixture.py). Each size runs in its own process and the results are written
+as JSON.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 1000,10000,100000,1000000] [--repeat 3] [--output results.json]
+    python benchmarks/run_benchmarks.py --compare baseline.json results.json [--threshold 1.25]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+RESULTS_DIR = os.path.join(current_dir, 'results')
+
+# Uncached TextBlob scoring is slow, so analyze_sentiment runs on at most this many texts
+SENTIMENT_SAMPLE = 20000
+
+
+def measure(name, size, items, repeat, func):
+    """Time func repeat times; returns the result dict and the last return value"""
+    times = []
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        times.append(time.perf_counter() - start)
+    result = {
+        'benchmark': name,
+        'size': size,
+        'items': items,
+        'repeat': repeat,
+        'min_s': round(min(times), 6),
+        'median_s': round(statistics.median(times), 6),
+        'max_s': round(max(times), 6),
+    }
+    print(f"  {name:<45}{result['min_s'] * 1000:>12.1f} ms")
+    return result, value
+
+
+def run_size(size, seed, repeat, sql_file):
+    """Run every benchmark against the database with size reviews"""
+    import fixture
+    from sqlalchemy import event
+
+    app_module = fixture.open_database(size, seed, sql_file)
+    app, db = app_module.app, app_module.db
+    from preprocessing import TextPreprocessor, SentimentAnalyzer, ReviewSnapshot, get_processor, get_review_statistics, load_numpy
+
+    print(f"\n{size} reviews")
+    results = []
+    with app.app_context():
+        # Loading the reviews is not part of any timing
+        reviews = app_module.Review.query.all()
+        processor = get_processor()
+        texts = [processor.get_review_text(review) for review in reviews]
+
+        preprocessor = TextPreprocessor()
+        result, _ = measure('clean_text', size, len(texts), repeat,
+                            lambda: [preprocessor.clean_text(text) for text in texts])
+        results.append(result)
+
+        sample = texts[:SENTIMENT_SAMPLE]
+        analyzer = SentimentAnalyzer(cache_size=0)
+        result, _ = measure('analyze_sentiment', size, len(sample), repeat,
+                            lambda: [analyzer.analyze_sentiment(text) for text in sample])
+        results.append(result)
+
+        result, _ = measure('get_review_statistics', size, len(reviews), repeat,
+                            lambda: get_review_statistics(reviews))
+        results.append(result)
+
+        if load_numpy() is not None:
+            snapshot = ReviewSnapshot(processor)
+            snapshot.append(reviews)
+            result, _ = measure('ReviewSnapshot.get_dashboard_data', size, snapshot.size, repeat,
+                                lambda: snapshot.get_dashboard_data())
+            result['snapshot_bytes'] = snapshot.nbytes
+            results.append(result)
+            del snapshot
+
+        del reviews, texts, sample
+        db.session.expunge_all()
+
+        queries = [0]
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: queries.__setitem__(0, queries[0] + 1))
+
+    client = fixture.admin_client(app)
+    # The live stream is long-lived, so it is not timed
+    routes = sorted(rule.rule for rule in app.url_map.iter_rules()
+                    if rule.rule.startswith('/api/analytics/') and rule.endpoint != 'api_analytics_stream')
+    routes.append('/admin/export_csv')
+    for route in routes:
+        def request_route():
+            queries[0] = 0
+            response = client.get(route)
+            return response.status_code, len(response.get_data())
+        result, (status, size_bytes) = measure(route, size, size, repeat, request_route)
+        result.update({'status': status, 'response_bytes': size_bytes, 'queries': queries[0]})
+        results.append(result)
+
+    return results
+
+
+def git_commit():
+    """Current commit of the working tree, or None outside a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=parent_dir, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, seed, repeat, sql_file, output):
+    """Run each size in a fresh process and write the combined results"""
+    results = []
+    for size in sizes:
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            part = f.name
+        try:
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--size-worker', str(size),
+                            '--seed', str(seed), '--repeat', str(repeat), '--sql-file', sql_file,
+                            '--output', part], check=True)
+            with open(part) as f:
+                results.extend(json.load(f))
+        finally:
+            os.remove(part)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'sizes': sizes,
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+def compare(baseline_file, results_file, threshold):
+    """
+    Compare the min times of two result files
+    Returns the number of benchmarks that got slower by more than threshold
+    """
+    with open(baseline_file) as f:
+        baseline = {(r['benchmark'], r['size']): r for r in json.load(f)['results']}
+    with open(results_file) as f:
+        current = json.load(f)['results']
+
+    regressions = 0
+    print(f"{'benchmark':<45}{'size':>9}{'baseline ms':>14}{'current ms':>14}{'ratio':>8}")
+    for result in current:
+        before = baseline.get((result['benchmark'], result['size']))
+        if not before:
+            continue
+        ratio = result['min_s'] / before['min_s'] if before['min_s'] else float('inf')
+        flag = ''
+        if ratio > threshold:
+            regressions += 1
+            flag = '  REGRESSION'
+        print(f"{result['benchmark']:<45}{result['size']:>9}{before['min_s'] * 1000:>14.1f}"
+              f"{result['min_s'] * 1000:>14.1f}{ratio:>7.2f}x{flag}")
+    print(f"\n{regressions} regression(s) above {threshold:.2f}x")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark preprocessing and the analytics endpoints')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma-separated review counts (default: 1000,10000,100000,1000000)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark; the minimum is reported (default: 3)')
+    parser.add_argument('--seed', type=int, default=0, help='synthetic data seed (default: 0)')
+    parser.add_argument('--sql-file', default=os.path.join(parent_dir, 'sentiment_db.sql'),
+                        help='dump the synthetic data is modelled on')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/benchmark-<timestamp>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'RESULTS'), help='compare two result files')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown ratio reported as a regression by --compare (default: 1.25)')
+    parser.add_argument('--size-worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(args.compare[0], args.compare[1], args.threshold) else 0)
+
+    if args.size_worker:
+        results = run_size(args.size_worker, args.seed, args.repeat, args.sql_file)
+        with open(args.output, 'w') as f:
+            json.dump(results, f)
+    else:
+        output = args.output or os.path.join(
+            RESULTS_DIR, f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+        run([int(size) for size in args.sizes.split(',')], args.seed, args.repeat, args.sql_file, output)
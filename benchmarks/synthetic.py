@@ -0,0 +1,108 @@
+"""
+Synthetic review generator seeded from the real data in sentiment_db.sql
+Learns the rating vocabulary of every rating field, how often reviews carry a
+comment, comment lengths and word frequencies, and how reviews spread over
+subjects, then draws any number of reviews with the same shape
+"""
+import os
+import random
+import sys
+from collections import Counter
+from decimal import Decimal
+from itertools import accumulate
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_dump import INSERT_PREFIX, iter_statements, parse_insert
+
+RATING_FIELDS = ['teaching', 'course_content', 'examination', 'lab_support', 'teaching_method', 'library_support']
+
+
+def read_dump_tables(sql_file, tables):
+    """
+    Read the rows of some tables from a mysqldump/phpMyAdmin SQL file
+    Returns: {table: (column names, list of row tuples)}
+    """
+    data = {}
+    for _, statement in iter_statements(sql_file):
+        match = INSERT_PREFIX.match(statement)
+        if not match or match.group(2).strip('`') not in tables or not match.group(3):
+            continue
+        parsed = parse_insert(statement)
+        if not parsed:
+            continue
+        columns = [column.strip(' `') for column in match.group(3).strip('()').split(',')]
+        rows = data.setdefault(match.group(2).strip('`'), (columns, []))[1]
+        rows.extend(tuple(float(value) if isinstance(value, Decimal) else value for value in row) for row in parsed[1])
+    return data
+
+
+class ReviewDistribution:
+    """Distributions of the review table, used to draw synthetic reviews"""
+
+    CATALOG_TABLES = ('regulation', 'semester', 'subject', 'user')
+
+    def __init__(self, sql_file):
+        data = read_dump_tables(sql_file, self.CATALOG_TABLES + ('review',))
+        self.catalog = {table: data[table] for table in self.CATALOG_TABLES}
+        columns, rows = data['review']
+        reviews = [dict(zip(columns, row)) for row in rows]
+
+        self.ratings = {
+            field: Counter(review.get(field) or '' for review in reviews)
+            for field in RATING_FIELDS
+        }
+
+        comments = [review['comment'].split() for review in reviews if review.get('comment') and review['comment'].strip()]
+        self.comment_rate = len(comments) / len(reviews)
+        self.comment_lengths = Counter(len(words) for words in comments)
+        self.comment_words = Counter(word for words in comments for word in words)
+
+        # Every catalog subject can be drawn, weighted by its real review count
+        subject_columns, subject_rows = self.catalog['subject']
+        subject_semester = {row[subject_columns.index('id')]: row[subject_columns.index('semester_id')] for row in subject_rows}
+        semester_columns, semester_rows = self.catalog['semester']
+        semester_regulation = {row[semester_columns.index('id')]: row[semester_columns.index('regulation_id')] for row in semester_rows}
+        review_counts = Counter(review['subject_id'] for review in reviews)
+        self.subjects = [
+            (subject_id, semester_id, semester_regulation[semester_id], review_counts[subject_id] + 1)
+            for subject_id, semester_id in sorted(subject_semester.items())
+            if semester_id in semester_regulation
+        ]
+
+        user_columns, user_rows = self.catalog['user']
+        self.student_ids = [row[user_columns.index('id')] for row in user_rows if row[user_columns.index('role')] == 'student']
+        self.last_day = max(review['created_at'] for review in reviews if review.get('created_at'))[:10]
+
+    def generate(self, count, seed=0, days=180):
+        """
+        Yield count review dicts (without id or sentiment) drawn from the distributions
+        created_at is spread over the days before the newest real review
+        """
+        rng = random.Random(seed)
+        # (population, cumulative weights) pairs for rng.choices
+        ratings = {field: (list(counter), list(accumulate(counter.values()))) for field, counter in self.ratings.items()}
+        lengths = (list(self.comment_lengths), list(accumulate(self.comment_lengths.values())))
+        words = (list(self.comment_words), list(accumulate(self.comment_words.values())))
+        subjects = ([subject[:3] for subject in self.subjects], list(accumulate(subject[3] for subject in self.subjects)))
+        last_day = datetime.strptime(self.last_day, '%Y-%m-%d')
+
+        for _ in range(count):
+            subject_id, semester_id, regulation_id = rng.choices(subjects[0], cum_weights=subjects[1])[0]
+            comment = None
+            if rng.random() < self.comment_rate:
+                length = rng.choices(lengths[0], cum_weights=lengths[1])[0]
+                comment = ' '.join(rng.choices(words[0], cum_weights=words[1], k=length))
+            review = {
+                'student_id': rng.choice(self.student_ids),
+                'regulation_id': regulation_id,
+                'semester_id': semester_id,
+                'subject_id': subject_id,
+                'feedback': comment or 'submitted',
+                'comment': comment,
+                'created_at': last_day - timedelta(days=rng.randrange(days), seconds=rng.randrange(86400)),
+            }
+            for field, (values, cum_weights) in ratings.items():
+                review[field] = rng.choices(values, cum_weights=cum_weights)[0]
+            yield review
@@ -0,0 +1,181 @@
+"""
+Check the routes against their SQL statement budgets (see query_budget.py)
+Seeds a local SQLite database with the benchmark fixture (cached in
+benchmarks/.data), calls each route below through the test client as the
+student with the most reviews or as an admin, and counts its statements,
+including those of a streamed response. A route that goes over the budget
+declared with @query_budget fails the check and its statements are listed;
+a route without a budget fails too, so new routes get one. The review
+submit routes then post a semester's and a regulation's reviews, which must
+be written, and the database is restored afterwards.
+
+Usage: python check_query_budgets.py [reviews] [-v]   # default 1000 reviews; -v prints every statement
+Exits with status 1 when a route goes over its budget
+"""
+import os
+import sqlite3
+import sys
+from contextlib import closing
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, 'benchmarks'))
+
+import fixture
+from sqlalchemy import func
+
+ANALYTICS_FILTERS = [
+    '',
+    'regulation_id={regulation_id}',
+    'student_id={student_id}',
+    'from={day}&to={day}',
+]
+
+# Rating text posted for every field of a submitted review
+SUBMITTED_RATING = 'Good'
+
+def sample_ids(app_module):
+    """
+    Ids of the student with the most reviews, one of their reviews and its day,
+    and of the subjects of that review's semester and regulation
+    """
+    db, Review, User = app_module.db, app_module.Review, app_module.User
+    Subject, Semester = app_module.Subject, app_module.Semester
+    row = db.session.query(Review.student_id, func.count(Review.id)).group_by(Review.student_id).order_by(func.count(Review.id).desc()).first()
+    if row is None:
+        print("❌ The database has no reviews to check the routes with")
+        sys.exit(1)
+    student = db.session.get(User, row[0])
+    review = Review.query.filter(Review.student_id == student.id, Review.created_at.isnot(None)).order_by(Review.id).first()
+    regulation_subjects = db.session.query(Subject.id).join(Semester, Subject.semester_id == Semester.id).filter(
+        Semester.regulation_id == review.regulation_id).order_by(Subject.id).limit(app_module.REVIEW_BATCH_LIMIT)
+    return {
+        'student_id': student.id,
+        'student_reviews': row[1],
+        'reg_no': student.reg_no,
+        'regulation_id': review.regulation_id,
+        'semester_id': review.semester_id,
+        'day': review.created_at.strftime('%Y-%m-%d'),
+        'semester_subject_ids': [subject.id for subject in Subject.query.filter_by(semester_id=review.semester_id)],
+        'regulation_subject_ids': [subject_id for subject_id, in regulation_subjects],
+    }
+
+def route_checks(app, ids):
+    """(description, client role, method, url, request body) for every read-only request to check"""
+    checks = [
+        ('index', 'student', 'GET', '/', {}),
+        ('student login', None, 'POST', '/login/student', {'data': {'reg_no': ids['reg_no'], 'password': 'x'}}),
+        ('staff login', None, 'POST', '/login/staff', {'data': {'staff_id': ids['reg_no'], 'password': 'x'}}),
+        ('student dashboard', 'student', 'GET', '/student/dashboard', {}),
+        (f"my reviews ({ids['student_reviews']})", 'student', 'GET', '/student/my_reviews', {}),
+        ('select semester', 'student', 'GET', f"/student/select/{ids['regulation_id']}", {}),
+        ('review form', 'student', 'GET', f"/student/review/{ids['regulation_id']}/{ids['semester_id']}", {}),
+        ('admin dashboard', 'admin', 'GET', '/admin/dashboard', {}),
+        ('export', 'admin', 'GET', '/admin/export_csv', {}),
+        ('export', 'admin', 'GET', '/admin/export_csv?student_id={student_id}'.format(**ids), {}),
+    ]
+    # The live stream never finishes; its queries are the dashboard's own
+    routes = sorted(rule.rule for rule in app.url_map.iter_rules()
+                    if rule.rule.startswith('/api/analytics/') and rule.endpoint != 'api_analytics_stream')
+    for route in routes:
+        for query in ANALYTICS_FILTERS:
+            checks.append(('analytics', 'admin', 'GET', f'{route}?{query.format(**ids)}', {}))
+    return checks
+
+def submission_checks(ids):
+    """(description, client role, method, url, request body, reviews written) for the review submit routes"""
+    from preprocessing import RATING_FIELDS
+
+    ratings = {field: SUBMITTED_RATING for field in RATING_FIELDS}
+    form = {'action': 'submit'}
+    for subject_id in ids['semester_subject_ids']:
+        form.update({f'{field}_{subject_id}': value for field, value in ratings.items()})
+        form[f'comment_{subject_id}'] = 'Clear lectures, but the lab needs more time'
+    reviews = [
+        dict(ratings, subject_id=subject_id, comment='Helpful examples' if subject_id % 2 else None)
+        for subject_id in ids['regulation_subject_ids']
+    ]
+    return [
+        (f"submit semester ({len(ids['semester_subject_ids'])} reviews)", 'student', 'POST',
+         f"/student/review/{ids['regulation_id']}/{ids['semester_id']}?step=0", {'data': form}, len(ids['semester_subject_ids'])),
+        (f"submit API ({len(reviews)} reviews)", 'student', 'POST', '/api/student/reviews',
+         {'json': {'regulation_id': ids['regulation_id'], 'reviews': reviews}}, len(reviews)),
+    ]
+
+def check_query_budgets(size=1000, verbose=False):
+    """Run every route check; returns the number of routes over (or without) a budget"""
+    app_module = fixture.open_database(size)
+    app = app_module.app
+    from query_budget import QueryBudgetExceeded, count_queries
+
+    # Exceptions reach the test client, and a route over budget raises
+    app.testing = True
+    app.config['QUERY_BUDGET_STRICT'] = True
+
+    with app.app_context():
+        ids = sample_ids(app_module)
+    # Requests run outside this app context: inside it they would share one
+    # session, and its identity map would hide lazy loads and the user loader
+    clients = {None: app.test_client(), 'admin': fixture.admin_client(app), 'student': app.test_client()}
+    with clients['student'].session_transaction() as sess:
+        sess['_user_id'] = str(ids['student_id'])
+        sess['_fresh'] = True
+
+    adapter = app.url_map.bind('localhost')
+
+    def check_route(description, role, method, url, body, written=None):
+        """Request url and report its statements against the budget; returns True when it fails"""
+        endpoint, _ = adapter.match(url.split('?')[0], method=method)
+        budget = getattr(app.view_functions[endpoint], 'query_budget', None)
+        error = None
+        if written is not None:
+            with app.app_context():
+                reviews_before = app_module.Review.query.count()
+        with count_queries() as counter:
+            try:
+                response = clients[role].open(url, method=method, **body)
+                response.get_data()
+                status = response.status_code
+            except QueryBudgetExceeded as e:
+                error, status = e, 'over budget'
+
+        if budget is None:
+            error = 'no @query_budget'
+        elif written is not None and not error:
+            # A rejected submission would pass on the statements of its error path
+            with app.app_context():
+                added = app_module.Review.query.count() - reviews_before
+            if added != written:
+                error = f'{added} of {written} reviews written'
+                print(f"      {error}")
+        mark = '❌' if error else '✅'
+        print(f"{mark} {method} {url} ({description}, {status}): {counter.count} queries, budget {budget}")
+        if error or verbose:
+            for statement in counter.statements:
+                print(f"      {' '.join(statement.split())[:160]}")
+        return bool(error)
+
+    failures = 0
+    for check in route_checks(app, ids):
+        failures += check_route(*check)
+
+    # The submissions write to the cached database; put it back as it was
+    path = fixture.database_path(size)
+    snapshot = sqlite3.connect(':memory:')
+    with closing(sqlite3.connect(path)) as conn:
+        conn.backup(snapshot)
+    try:
+        for check in submission_checks(ids):
+            failures += check_route(*check)
+    finally:
+        with app.app_context():
+            app_module.db.engine.dispose()
+        with closing(sqlite3.connect(path)) as conn:
+            snapshot.backup(conn)
+        snapshot.close()
+
+    print(f"\n{failures} route(s) over their query budget")
+    return failures
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '-v']
+    sys.exit(1 if check_query_budgets(int(args[0]) if args else 1000, verbose='-v' in sys.argv) else 0)
@@ -0,0 +1,140 @@
+"""
+Check the query plans of the routes against the configured database
+Calls each route below through the test client with real ids from the
+database, records every SELECT it runs and EXPLAINs it. A filtered query
+(one with a WHERE clause) that reads review, review_rollup or user with a
+full scan fails the check; unfiltered whole-table aggregates are expected.
+Run python add_indexes.py first on an existing database. On MySQL, check a
+database with realistic row counts: the optimizer scans tiny tables whole
+even when an index fits, and such a scan fails the check.
+
+Usage: python check_query_plans.py [-v]   # -v prints every plan
+Exits with status 1 when a query falls back to a full scan
+"""
+import re
+import sys
+from sqlalchemy import event
+from app import app, db, User, Review
+
+# Tables large enough that a filtered query must not scan them
+LARGE_TABLES = {'review', 'review_rollup', 'user'}
+
+ANALYTICS_FILTERS = [
+    'regulation_id={regulation_id}',
+    'semester_id={semester_id}',
+    'subject_id={subject_id}',
+    'student_id={student_id}',
+    'from={day}&to={day}',
+]
+
+EXPORT_FILTERS = ANALYTICS_FILTERS + ['regulation_id={regulation_id}&semester_id={semester_id}&from={day}']
+
+def explain(connection, statement, parameters):
+    """
+    Plan of one statement
+    Returns: list of (table, full scan?, plan line)
+    """
+    plan = []
+    if connection.dialect.name == 'sqlite':
+        for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters):
+            detail = row[-1]
+            match = re.match(r'SCAN (?:TABLE )?(\w+)', detail)
+            plan.append((match.group(1) if match else None, bool(match), detail))
+    else:
+        result = connection.exec_driver_sql('EXPLAIN ' + statement, parameters)
+        columns = list(result.keys())
+        for row in result:
+            row = dict(zip(columns, row))
+            # ALL is a full scan even when possible_keys lists indexes the optimizer
+            # rejected; index reads the whole index, and the table too unless it covers
+            extra = row.get('Extra') or ''
+            full_scan = row.get('type') == 'ALL' or (row.get('type') == 'index' and 'Using index' not in extra)
+            detail = (f"{row.get('table')}: type={row.get('type')} key={row.get('key')} "
+                      f"possible_keys={row.get('possible_keys')} extra={extra}")
+            plan.append((row.get('table'), full_scan, detail))
+    return plan
+
+def sample_ids():
+    """Ids of an existing review, its student and its day, used as filter values"""
+    review = Review.query.filter(Review.created_at.isnot(None)).order_by(Review.id).first()
+    student = db.session.get(User, review.student_id) if review else None
+    if not review or not student:
+        print("❌ The database has no reviews to check the routes with")
+        sys.exit(1)
+    return {
+        'regulation_id': review.regulation_id,
+        'semester_id': review.semester_id,
+        'subject_id': review.subject_id,
+        'student_id': student.id,
+        'reg_no': student.reg_no,
+        'day': review.created_at.strftime('%Y-%m-%d'),
+    }
+
+def route_checks(ids):
+    """(description, client role, method, url, form) for every request to check"""
+    checks = [
+        ('student login', None, 'POST', '/login/student', {'reg_no': ids['reg_no'], 'password': 'x'}),
+        ('staff login', None, 'POST', '/login/staff', {'staff_id': ids['reg_no'], 'password': 'x'}),
+        ('my reviews', 'student', 'GET', '/student/my_reviews', None),
+    ]
+    for query in EXPORT_FILTERS:
+        checks.append(('export', 'admin', 'GET', '/admin/export_csv?' + query.format(**ids), None))
+    # The live stream never finishes; its queries are the dashboard's own
+    routes = sorted(rule.rule for rule in app.url_map.iter_rules()
+                    if rule.rule.startswith('/api/analytics/') and rule.endpoint != 'api_analytics_stream')
+    for route in routes:
+        for query in ANALYTICS_FILTERS:
+            checks.append(('analytics', 'admin', 'GET', f'{route}?{query.format(**ids)}', None))
+    return checks
+
+def check_query_plans(verbose=False):
+    """Run every route check; returns the number of queries that fell back to a full scan"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        ids = sample_ids()
+        clients = {None: app.test_client(), 'admin': app.test_client(), 'student': app.test_client()}
+        with clients['admin'].session_transaction() as sess:
+            sess['admin'] = True
+        with clients['student'].session_transaction() as sess:
+            sess['_user_id'] = str(ids['student_id'])
+            sess['_fresh'] = True
+
+        failures = 0
+        for description, role, method, url, form in route_checks(ids):
+            statements.clear()
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                response = clients[role].open(url, method=method, data=form)
+                response.get_data()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+
+            scans = []
+            # The app pools a single connection, so EXPLAIN through the session's
+            connection = db.session.connection()
+            for statement, parameters in statements:
+                plan = explain(connection, statement, parameters)
+                if verbose:
+                    print(f"   {' '.join(statement.split())[:120]}")
+                    for _, _, detail in plan:
+                        print(f"      {detail}")
+                if ' WHERE ' not in ' '.join(statement.upper().split()):
+                    continue
+                scans.extend(detail for table, full_scan, detail in plan if full_scan and table in LARGE_TABLES)
+
+            status = '❌' if scans else '✅'
+            print(f"{status} {method} {url} ({description}, {response.status_code}): {len(statements)} queries")
+            for detail in scans:
+                print(f"      full scan: {detail}")
+            failures += len(scans)
+
+    print(f"\n{failures} full scan(s) in filtered queries")
+    return failures
+
+if __name__ == '__main__':
+    sys.exit(1 if check_query_plans(verbose='-v' in sys.argv) else 0)
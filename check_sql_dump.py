@@ -0,0 +1,279 @@
+"""
+Check the SQL dump reader and importer (sql_dump.py) against the dumps in the repo
+- sentiment_db.sql and sentiment_db_export.sql parse into the statement and
+  row counts below
+- every dump, and an edge-case dump with quoted ';', escaped quotes and
+  '--' / '#' / '/* */' / '/*! */' comments, splits into the same statements
+  whatever the read chunk size, down to 1 character
+- DumpImporter, through a connection that drops mid-import, resumes from its
+  checkpoint and writes every row of the dump exactly once
+- DumpImporter carries on past CREATE TABLE into tables that already exist
+  (error 1050) and past a row the server rejects (error 1406), raised with
+  the exception classes pymysql gives those error numbers
+
+Usage: python check_sql_dump.py
+Exits with status 1 when a check fails
+"""
+import gzip
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+from collections import Counter
+from decimal import Decimal
+import pymysql
+import sql_dump
+from sql_dump import DumpImporter, iter_statements, parse_insert, summarize_dump
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# dump: (statements, rows per table)
+EXPECTED_DUMPS = {
+    'sentiment_db.sql': (46, {
+        'filtered_reviews__8_': 2676, 'regulation': 2, 'review': 394, 'semester': 16, 'subject': 126, 'user': 26,
+    }),
+    'sentiment_db_export.sql': (3254, {
+        'filtered_reviews__8_': 2676, 'regulation': 2, 'review': 394, 'semester': 16, 'subject': 126, 'user': 26,
+    }),
+}
+
+READ_SIZES = (1, 2, 7, 4096, sql_dump.READ_SIZE)
+
+EDGE_CASE_DUMP = """-- header comment; with a semicolon
+# hash comment; too
+/* block; comment */
+/*!40101 SET NAMES utf8mb4 */;
+CREATE TABLE `odd;name` (`id` int, `note` text);
+INSERT INTO `odd;name` (`id`, `note`) VALUES (1,'semi; colon'),(2,'it\\'s'),(3,'it''s'),(4,"dq; \\"x\\""),(5,NULL),(6,'line\\nbreak -- no # comment /* here */;');
+SELECT 1--1;
+SELECT 2 /* mid; */ + 3;
+SELECT 4 -- tail;
+ + 5;
+INSERT INTO t VALUES (-2, 1.5, 0x4142)"""
+
+EDGE_CASE_STATEMENTS = [
+    '/*!40101 SET NAMES utf8mb4 */',
+    'CREATE TABLE `odd;name` (`id` int, `note` text)',
+    "INSERT INTO `odd;name` (`id`, `note`) VALUES (1,'semi; colon'),(2,'it\\'s'),(3,'it''s'),(4,\"dq; \\\"x\\\"\"),(5,NULL),(6,'line\\nbreak -- no # comment /* here */;')",
+    'SELECT 1--1',
+    'SELECT 2  + 3',
+    'SELECT 4  + 5',
+    'INSERT INTO t VALUES (-2, 1.5, 0x4142)',
+]
+
+EDGE_CASE_ROWS = {
+    2: ('INSERT INTO `odd;name` (`id`, `note`)', [
+        (1, 'semi; colon'), (2, "it's"), (3, "it's"), (4, 'dq; "x"'), (5, None),
+        (6, 'line\nbreak -- no # comment /* here */;'),
+    ]),
+    6: ('INSERT INTO t', [(-2, Decimal('1.5'), b'AB')]),
+}
+
+
+def report(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    return 0 if ok else 1
+
+
+def statements_with_read_size(sql_file, read_size):
+    """Every statement of a dump, reading read_size characters at a time"""
+    default = sql_dump.READ_SIZE
+    sql_dump.READ_SIZE = read_size
+    try:
+        return [statement for _, statement in iter_statements(sql_file)]
+    finally:
+        sql_dump.READ_SIZE = default
+
+
+def check_dump_counts(sql_file, expected_statements, expected_rows):
+    statements, rows, unparsed = summarize_dump(sql_file)
+    name = os.path.basename(sql_file)
+    failures = report(statements == expected_statements, f"{name}: {statements} statements (expected {expected_statements})")
+    failures += report(rows == expected_rows, f"{name}: {sum(rows.values())} rows {rows}")
+    failures += report(not unparsed, f"{name}: every INSERT parsed into rows")
+    return failures
+
+
+def check_read_sizes(sql_file):
+    """The statements must not depend on where the chunks are cut"""
+    reference = statements_with_read_size(sql_file, sql_dump.READ_SIZE)
+    failures = 0
+    for read_size in READ_SIZES:
+        same = statements_with_read_size(sql_file, read_size) == reference
+        failures += report(same, f"{os.path.basename(sql_file)}: same {len(reference)} statements with {read_size}-character reads")
+    return failures
+
+
+def check_edge_cases(workdir):
+    failures = 0
+    for name, opener in (('edge_cases.sql', open), ('edge_cases.sql.gz', gzip.open)):
+        path = os.path.join(workdir, name)
+        with opener(path, 'wt', encoding='utf-8') as f:
+            f.write(EDGE_CASE_DUMP)
+        for read_size in READ_SIZES:
+            statements = statements_with_read_size(path, read_size)
+            failures += report(statements == EDGE_CASE_STATEMENTS, f"{name}: quotes and comments split correctly with {read_size}-character reads")
+            if statements != EDGE_CASE_STATEMENTS:
+                for statement in statements:
+                    print(f"      {statement!r}")
+    for index, expected in EDGE_CASE_ROWS.items():
+        parsed = parse_insert(EDGE_CASE_STATEMENTS[index])
+        failures += report(parsed == expected, f"edge_cases.sql: statement {index + 1} parses into {len(expected[1])} rows")
+    return failures
+
+
+CREATE_TABLE = re.compile(r"CREATE TABLE\s+`?(\w+)`?", re.IGNORECASE)
+TABLE_EXISTS = 1050
+DATA_TOO_LONG = 1406
+
+
+def raise_server_error(errno, message):
+    """Raise a MySQL server error with the exception class pymysql picks for errno"""
+    pymysql.err.raise_mysql_exception(b'\xff' + struct.pack('<h', errno) + b'#HY000' + message.encode())
+
+
+class DroppingDatabase:
+    """
+    DB-API stand-in for the importer: keeps committed rows, loses the
+    connection (MySQL error 2013) on the drop_at-th executemany, fails
+    CREATE TABLE for existing_tables and rejects the rejected_rows
+    """
+
+    def __init__(self, drop_at=None, existing_tables=(), rejected_rows=()):
+        self.drop_at = drop_at
+        self.existing_tables = set(existing_tables)
+        self.rejected_rows = set(rejected_rows)
+        self.batches = 0
+        self.connections = 0
+        self.committed = Counter()
+
+    def connect(self):
+        self.connections += 1
+        return DroppingConnection(self)
+
+
+class DroppingConnection:
+    def __init__(self, database):
+        self.database = database
+        self.pending = Counter()
+
+    def cursor(self):
+        return self
+
+    def execute(self, statement, params=None):
+        if params is None:
+            table = CREATE_TABLE.match(statement)
+            if table and table.group(1) in self.database.existing_tables:
+                raise_server_error(TABLE_EXISTS, f"Table '{table.group(1)}' already exists")
+            return
+        self.check_row(params)
+        self.pending[(statement, tuple(params))] += 1
+
+    def executemany(self, query, rows):
+        self.database.batches += 1
+        if self.database.batches == self.database.drop_at:
+            raise pymysql.err.OperationalError(2013, 'Lost connection to MySQL server during query')
+        # Like a multi-row INSERT, one rejected row fails the whole batch
+        for row in rows:
+            self.check_row(row)
+        for row in rows:
+            self.pending[(query, tuple(row))] += 1
+
+    def check_row(self, row):
+        if tuple(row) in self.database.rejected_rows:
+            raise_server_error(DATA_TOO_LONG, "Data too long for column 'comment' at row 1")
+
+    def commit(self):
+        self.database.committed.update(self.pending)
+        self.pending = Counter()
+
+    def close(self):
+        self.pending = Counter()
+
+
+def check_importer_resume(sql_file, workdir):
+    """Drop the connection mid-import and check every row lands exactly once"""
+    path = os.path.join(workdir, os.path.basename(sql_file))
+    shutil.copy(sql_file, path)
+    expected = Counter()
+    for _, statement in iter_statements(path):
+        parsed = parse_insert(statement)
+        if parsed:
+            prefix, rows = parsed
+            query = f"{prefix.replace('%', '%%')} VALUES ({', '.join(['%s'] * len(rows[0]))})"
+            expected.update((query, row) for row in rows)
+
+    database = DroppingDatabase(drop_at=7)
+    importer = DumpImporter(path, database.connect, batch_rows=200, commit_rows=500)
+    # No back-off wait before reconnecting here
+    sleep, sql_dump.time.sleep = sql_dump.time.sleep, lambda seconds: None
+    try:
+        importer.run()
+    finally:
+        sql_dump.time.sleep = sleep
+
+    name = os.path.basename(sql_file)
+    failures = report(database.connections == 2, f"{name}: import reconnected once after the dropped connection")
+    failures += report(database.committed == expected,
+                       f"{name}: {sum(database.committed.values())} of {sum(expected.values())} rows imported exactly once after resuming")
+    failures += report(not os.path.exists(importer.checkpoint_file), f"{name}: checkpoint removed after the import")
+    return failures
+
+
+def check_importer_statement_errors(sql_file, workdir):
+    """Import into a database that has every table already and rejects one row"""
+    path = os.path.join(workdir, os.path.basename(sql_file))
+    shutil.copy(sql_file, path)
+    tables = set()
+    expected = Counter()
+    for _, statement in iter_statements(path):
+        table = CREATE_TABLE.match(statement)
+        if table:
+            tables.add(table.group(1))
+        parsed = parse_insert(statement)
+        if parsed:
+            prefix, rows = parsed
+            query = f"{prefix.replace('%', '%%')} VALUES ({', '.join(['%s'] * len(rows[0]))})"
+            expected.update((query, row) for row in rows)
+    rejected = next(iter(expected))
+
+    database = DroppingDatabase(existing_tables=tables, rejected_rows=[rejected[1]])
+    importer = DumpImporter(path, database.connect, batch_rows=200, commit_rows=500)
+    try:
+        importer.run()
+    except pymysql.err.MySQLError as e:
+        return report(False, f"{os.path.basename(sql_file)}: import into existing tables stopped on {e!r}")
+    del expected[rejected]
+
+    name = os.path.basename(sql_file)
+    failures = report(bool(tables), f"{name}: CREATE TABLE of {len(tables)} existing tables skipped")
+    failures += report(importer.errors == 1, f"{name}: the rejected row reported ({importer.errors} error(s))")
+    failures += report(database.committed == expected,
+                       f"{name}: {sum(database.committed.values())} of {sum(expected.values())} other rows imported")
+    return failures
+
+
+def check_sql_dump():
+    """Run every check; returns the number of failures"""
+    failures = 0
+    workdir = tempfile.mkdtemp(prefix='check_sql_dump_')
+    try:
+        for name, (statements, rows) in EXPECTED_DUMPS.items():
+            sql_file = os.path.join(current_dir, name)
+            failures += check_dump_counts(sql_file, statements, rows)
+            failures += check_read_sizes(sql_file)
+        failures += check_edge_cases(workdir)
+        for name in EXPECTED_DUMPS:
+            failures += check_importer_resume(os.path.join(current_dir, name), workdir)
+            failures += check_importer_statement_errors(os.path.join(current_dir, name), workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{failures} failed check(s)")
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if check_sql_dump() else 0)
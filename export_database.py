@@ -1,8 +1,20 @@
 """
 Export local database to SQL file
+Rows are streamed from an unbuffered server-side cursor and written straight
+to the file as multi-row INSERTs, so memory stays flat for any table size.
+
+Usage:
+    python export_database.py                       # sentiment_db_export.sql
+    python export_database.py --gzip                # sentiment_db_export.sql.gz
+    python export_database.py --output dump.sql --batch-rows 1000
 """
-import pymysql
+import argparse
+import gzip
 import os
+import time
+import pymysql
+import pymysql.cursors
+from pymysql.converters import escape_item, escape_string
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,76 +24,109 @@ LOCAL_DB = {
     'host': 'localhost',
     'user': 'root',
     'password': '',  # Your local MySQL password
-    'database': 'sentiment_db'
+    'database': 'sentiment_db',
+    'charset': 'utf8mb4'
 }
 
-def export_database():
+OUTPUT_FILE = 'sentiment_db_export.sql'
+
+# Rows per INSERT, and a size cap that keeps each statement well under max_allowed_packet
+BATCH_ROWS = 500
+MAX_STATEMENT_BYTES = 1024 * 1024
+
+def sql_literal(value):
+    """MySQL literal for a column value; binary data is written as hex"""
+    if type(value) is str:
+        return "'" + escape_string(value) + "'"
+    if isinstance(value, (bytes, bytearray)):
+        return '0x' + value.hex() if value else "''"
+    return escape_item(value, 'utf8mb4')
+
+def write_table_rows(out, stream, table_name, batch_rows):
+    """Write the rows of an executed SELECT as multi-row INSERTs; returns the row count"""
+    columns = ', '.join(f"`{col[0]}`" for col in stream.description)
+    prefix = f"INSERT INTO `{table_name}` ({columns}) VALUES\n"
+    count = 0
+    values = []
+    size = 0
+
+    while True:
+        rows = stream.fetchmany(batch_rows)
+        if not rows:
+            break
+        for row in rows:
+            value = '(' + ', '.join(sql_literal(val) for val in row) + ')'
+            if values and (len(values) >= batch_rows or size + len(value) > MAX_STATEMENT_BYTES):
+                out.write(prefix + ',\n'.join(values) + ';\n')
+                values = []
+                size = 0
+            values.append(value)
+            size += len(value) + 2
+            count += 1
+
+    if values:
+        out.write(prefix + ',\n'.join(values) + ';\n')
+    return count
+
+def export_database(output=OUTPUT_FILE, batch_rows=BATCH_ROWS, compress=False):
     """Export all data from local database"""
+    if compress and not output.endswith('.gz'):
+        output += '.gz'
+    # Write next to the target and rename at the end, so a failed export never leaves half a dump
+    tmp_output = output + '.tmp'
+
     try:
         conn = pymysql.connect(**LOCAL_DB)
         cursor = conn.cursor()
-        
+        # Unbuffered: rows are read from the server as they are written out
+        stream = conn.cursor(pymysql.cursors.SSCursor)
+
         # Get all tables
         cursor.execute("SHOW TABLES")
-        tables = cursor.fetchall()
-        
-        sql_dump = []
-        sql_dump.append("-- Database Export\n")
-        sql_dump.append("SET FOREIGN_KEY_CHECKS=0;\n\n")
-        
-        for (table_name,) in tables:
-            print(f"Exporting table: {table_name}")
-            
-            # Get table structure
-            cursor.execute(f"SHOW CREATE TABLE `{table_name}`")
-            create_table = cursor.fetchone()[1]
-            sql_dump.append(f"-- Table: {table_name}\n")
-            sql_dump.append(f"DROP TABLE IF EXISTS `{table_name}`;\n")
-            sql_dump.append(f"{create_table};\n\n")
-            
-            # Get table data
-            cursor.execute(f"SELECT * FROM `{table_name}`")
-            rows = cursor.fetchall()
-            
-            if rows:
-                # Get column names
-                cursor.execute(f"DESCRIBE `{table_name}`")
-                columns = [col[0] for col in cursor.fetchall()]
-                
-                sql_dump.append(f"-- Data for table: {table_name}\n")
-                for row in rows:
-                    values = []
-                    for val in row:
-                        if val is None:
-                            values.append('NULL')
-                        elif isinstance(val, str):
-                            # Escape single quotes
-                            escaped = val.replace("'", "''")
-                            values.append(f"'{escaped}'")
-                        elif isinstance(val, (int, float)):
-                            values.append(str(val))
-                        else:
-                            values.append(f"'{str(val)}'")
-                    
-                    cols = ', '.join([f"`{col}`" for col in columns])
-                    vals = ', '.join(values)
-                    sql_dump.append(f"INSERT INTO `{table_name}` ({cols}) VALUES ({vals});\n")
-                
-                sql_dump.append("\n")
-        
-        sql_dump.append("SET FOREIGN_KEY_CHECKS=1;\n")
-        
-        # Write to file
-        with open('sentiment_db_export.sql', 'w', encoding='utf-8') as f:
-            f.writelines(sql_dump)
-        
+        tables = [table_name for (table_name,) in cursor.fetchall()]
+
+        started = time.perf_counter()
+        total_rows = 0
+        opener = gzip.open if output.endswith('.gz') else open
+        with opener(tmp_output, 'wt', encoding='utf-8') as out:
+            out.write("-- Database Export\n")
+            out.write("SET NAMES utf8mb4;\n")
+            out.write("SET FOREIGN_KEY_CHECKS=0;\n\n")
+
+            for table_name in tables:
+                print(f"Exporting table: {table_name}")
+
+                # Get table structure
+                cursor.execute(f"SHOW CREATE TABLE `{table_name}`")
+                create_table = cursor.fetchone()[1]
+                out.write(f"-- Table: {table_name}\n")
+                out.write(f"DROP TABLE IF EXISTS `{table_name}`;\n")
+                out.write(f"{create_table};\n\n")
+
+                # Get table data
+                stream.execute(f"SELECT * FROM `{table_name}`")
+                out.write(f"-- Data for table: {table_name}\n")
+                count = write_table_rows(out, stream, table_name, batch_rows)
+                out.write("\n")
+                total_rows += count
+                print(f"  {count} rows")
+
+            out.write("SET FOREIGN_KEY_CHECKS=1;\n")
+
+        os.replace(tmp_output, output)
+        elapsed = time.perf_counter() - started
+
         print("\n✅ Export successful!")
-        print("📁 File saved: sentiment_db_export.sql")
-        
+        print(f"📁 File saved: {output} ({os.path.getsize(output) / 1024:.0f} KB)")
+        print(f"   {total_rows} rows in {elapsed:.1f}s ({total_rows / elapsed if elapsed else 0:.0f} rows/s)")
+
+        stream.close()
         cursor.close()
         conn.close()
-        
+
     except Exception as e:
+        if os.path.exists(tmp_output):
+            os.remove(tmp_output)
         print(f"❌ Error: {e}")
         print("\nMake sure:")
         print("1. MySQL is running")
@@ -89,4 +134,11 @@ def export_database():
         print("3. Update LOCAL_DB password if needed")
 
 if __name__ == '__main__':
-    export_database()
+    parser = argparse.ArgumentParser(description='Export the local database to a SQL dump')
+    parser.add_argument('--output', default=OUTPUT_FILE, help=f'dump file (default: {OUTPUT_FILE})')
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS,
+                        help=f'rows per INSERT statement (default: {BATCH_ROWS})')
+    parser.add_argument('--gzip', action='store_true', help='gzip the dump (adds .gz to the file name)')
+    args = parser.parse_args()
+
+    export_database(output=args.output, batch_rows=args.batch_rows, compress=args.gzip)
@@ -1,8 +1,11 @@
 """
 Import SQL dump to Railway database
+Streams the dump in multi-row batches (see sql_dump.py); an interrupted
+import resumes from <sql_file>.checkpoint
 """
 import pymysql
 import os
+from sql_dump import DumpImporter
 
 # Railway database connection
 RAILWAY_DB = {
@@ -16,39 +19,22 @@ RAILWAY_DB = {
 def import_database(sql_file='sentiment_db_export.sql'):
     """Import SQL dump to Railway database"""
     try:
+        # export_database.py --gzip writes <sql_file>.gz
+        if not os.path.exists(sql_file) and os.path.exists(sql_file + '.gz'):
+            sql_file += '.gz'
         if not os.path.exists(sql_file):
             print(f"❌ File not found: {sql_file}")
             print("Run export_database.py first!")
             return
         
         print("Connecting to Railway database...")
+        print(f"Streaming SQL file: {sql_file}")
+        DumpImporter(sql_file, lambda: pymysql.connect(**RAILWAY_DB)).run()
+        print("🎉 Your database is now on Railway!")
+
         conn = pymysql.connect(**RAILWAY_DB)
         cursor = conn.cursor()
-        
-        print(f"Reading SQL file: {sql_file}")
-        with open(sql_file, 'r', encoding='utf-8') as f:
-            sql_content = f.read()
-        
-        # Split by semicolon and execute each statement
-        statements = sql_content.split(';\n')
-        
-        total = len(statements)
-        for i, statement in enumerate(statements, 1):
-            statement = statement.strip()
-            if statement and not statement.startswith('--'):
-                try:
-                    cursor.execute(statement)
-                    if i % 10 == 0:
-                        print(f"Progress: {i}/{total} statements...")
-                except Exception as e:
-                    # Skip errors for statements that might already exist
-                    if 'already exists' not in str(e).lower():
-                        print(f"Warning: {e}")
-        
-        conn.commit()
-        print("\n✅ Import successful!")
-        print("🎉 Your database is now on Railway!")
-        
+
         # Show table counts
         cursor.execute("SHOW TABLES")
         tables = cursor.fetchall()
@@ -67,6 +53,7 @@ def import_database(sql_file='sentiment_db_export.sql'):
         print("1. Railway database is running")
         print("2. Connection details are correct")
         print("3. SQL file exists")
+        print("Run the script again to resume from the last committed statement")
 
 if __name__ == '__main__':
     import_database()
@@ -0,0 +1,228 @@
+"""
+Request metrics in the Prometheus text format
+Records a latency histogram per route, the SQL statements of each request and
+the time spent in them (from SQLAlchemy engine events), connection pool
+checkout waits and usage, and the reviews scanned by the analytics routes.
+
+Each thread records into a shard of its own, so recording takes no lock; the
+shards are only merged when /metrics is scraped. Metrics are kept per process,
+so with several workers each scrape reports the worker that answered it.
+"""
+import bisect
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500)
+CHECKOUT_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+# name: (type, help text, buckets for histograms)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests served, by route, method and status', None),
+    'http_request_duration_seconds': ('histogram', 'Time to produce the response, by route', LATENCY_BUCKETS),
+    'db_statements_per_request': ('histogram', 'SQL statements executed per request, by route', STATEMENT_BUCKETS),
+    'db_statement_seconds_total': ('counter', 'Time spent executing SQL statements, by route', None),
+    'db_pool_checkout_wait_seconds': ('histogram', 'Time spent waiting for a pooled database connection', CHECKOUT_WAIT_BUCKETS),
+    'db_pool_checkout_timeouts_total': ('counter', 'Connection checkouts that gave up waiting for the pool', None),
+    'analytics_reviews_scanned_total': ('counter', 'Reviews read or aggregated through rollups by the analytics routes', None),
+}
+
+POOL_GAUGES = {
+    'db_pool_size': ('Connections the pool keeps open', 'size'),
+    'db_pool_checked_out': ('Connections in use', 'checkedout'),
+    'db_pool_checked_in': ('Idle connections in the pool', 'checkedin'),
+    'db_pool_overflow': ('Connections open beyond the pool size (negative while the pool is not full)', 'overflow'),
+}
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms sharded per thread
+    Values are keyed by (metric name, label tuple); a histogram value is the
+    count per bucket (the last one for +Inf) followed by the sum
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        # Totals of threads that have exited
+        self._retired = {}
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                # Thread-per-request servers start threads all the time; without
+                # a scraper the shards of exited ones would pile up here
+                self._retire_dead_shards()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def inc(self, name, labels=(), value=1):
+        """Add value to a counter"""
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        """Record one value in a histogram"""
+        shard = self._shard()
+        key = (name, labels)
+        histogram = shard.get(key)
+        if histogram is None:
+            histogram = shard[key] = [0] * (len(METRICS[name][2]) + 1) + [0.0]
+        histogram[bisect.bisect_left(METRICS[name][2], value)] += 1
+        histogram[-1] += value
+
+    @staticmethod
+    def _merge(totals, shard):
+        for key, value in list(shard.items()):
+            if isinstance(value, list):
+                merged = totals.get(key)
+                totals[key] = list(value) if merged is None else [a + b for a, b in zip(merged, value)]
+            else:
+                totals[key] = totals.get(key, 0) + value
+
+    def _retire_dead_shards(self):
+        """Fold the shards of exited threads into the retired totals; call with the lock held"""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._merge(self._retired, shard)
+        self._shards = live
+
+    def collect(self):
+        """Merged values of every thread"""
+        with self._lock:
+            self._retire_dead_shards()
+            totals = {}
+            self._merge(totals, self._retired)
+            for _, shard in self._shards:
+                self._merge(totals, shard)
+        return totals
+
+
+registry = MetricsRegistry()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            registry.inc('db_pool_checkout_timeouts_total')
+            raise
+        finally:
+            registry.observe('db_pool_checkout_wait_seconds', time.perf_counter() - start)
+
+
+def route_label():
+    """The URL rule of the current request; unmatched paths share one label"""
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def record_reviews_scanned(count):
+    """Count reviews read or aggregated by the current analytics request"""
+    if count and has_request_context():
+        registry.inc('analytics_reviews_scanned_total', (('route', route_label()),), count)
+
+
+def init_metrics(app, db):
+    """Record request and SQL metrics for app and the engine of db"""
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics = {'start': time.perf_counter(), 'statements': 0, 'statement_seconds': 0.0}
+
+    def finish_request_metrics(status):
+        request_metrics = g.pop('metrics', None)
+        if request_metrics is None:
+            return
+        route = (('route', route_label()),)
+        registry.inc('http_requests_total', route + (('method', request.method), ('status', str(status))))
+        registry.observe('http_request_duration_seconds', time.perf_counter() - request_metrics['start'], route)
+        registry.observe('db_statements_per_request', request_metrics['statements'], route)
+        registry.inc('db_statement_seconds_total', route, request_metrics['statement_seconds'])
+
+    @app.after_request
+    def record_request_metrics(response):
+        finish_request_metrics(response.status_code)
+        return response
+
+    @app.teardown_request
+    def record_failed_request_metrics(exc):
+        # Only still pending when the view raised
+        if exc is not None:
+            finish_request_metrics(500)
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_statement(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_statement_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def finish_statement(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_statement_start'].pop()
+        if has_request_context():
+            request_metrics = g.get('metrics')
+            if request_metrics is not None:
+                request_metrics['statements'] += 1
+                request_metrics['statement_seconds'] += elapsed
+
+    @event.listens_for(engine, 'handle_error')
+    def drop_failed_statement(context):
+        # after_cursor_execute does not run for a failed statement
+        starts = context.connection.info.get('metrics_statement_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in labels) + '}'
+
+
+def render_metrics(engine):
+    """Every metric in the Prometheus text exposition format"""
+    values = registry.collect()
+    lines = []
+    for name, (metric_type, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for (metric, labels), value in sorted((item for item in values.items() if item[0][0] == name), key=lambda item: item[0][1]):
+            if metric_type == 'counter':
+                lines.append(f'{name}{format_labels(labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", str(bound)),))} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {value[-1]}')
+            lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        for name, (help_text, method) in POOL_GAUGES.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {getattr(pool, method)()}')
+    return '\n'.join(lines) + '\n'
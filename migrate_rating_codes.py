@@ -0,0 +1,80 @@
+"""
+Migrate the rating fields to integer rating codes
+Adds the rating code columns to the review table if they are missing, fills
+the rating_label lookup table and stores the code of every review that has
+none yet, committing every batch. The rating text itself is kept, so the
+review pages, the CSV export and the themes still read it; the analytics
+read the codes. Run it again after importing reviews from a SQL dump.
+
+Usage: python migrate_rating_codes.py [batch_size]
+"""
+import sys
+import time
+from sqlalchemy import inspect, func, or_, bindparam
+from app import app, db, Review, RatingLabel
+from preprocessing import get_processor, RATING_FIELDS, RATING_CODE_FIELDS, RATING_LABELS
+
+def add_rating_code_columns():
+    """Add the rating code columns to an existing review table"""
+    existing = {col['name'] for col in inspect(db.engine).get_columns('review')}
+    col_type = 'TINYINT UNSIGNED' if db.engine.dialect.name == 'mysql' else 'SMALLINT'
+    for field in RATING_FIELDS:
+        name = RATING_CODE_FIELDS[field]
+        if name not in existing:
+            print(f"Adding column review.{name}")
+            db.session.execute(db.text(f"ALTER TABLE review ADD COLUMN {name} {col_type} NULL"))
+    db.session.commit()
+
+def fill_rating_labels():
+    """Create the rating_label table if needed and write every code's label"""
+    db.create_all()
+    for code, label in RATING_LABELS.items():
+        db.session.merge(RatingLabel(code=code, label=label))
+    db.session.commit()
+
+def migrate_rating_codes(batch_size=1000):
+    """Store the rating codes of reviews that have none, committing every batch"""
+    with app.app_context():
+        add_rating_code_columns()
+        fill_rating_labels()
+
+        processor = get_processor()
+        missing = or_(*(getattr(Review, RATING_CODE_FIELDS[field]).is_(None) for field in RATING_FIELDS))
+        total = db.session.query(func.count(Review.id)).filter(missing).scalar()
+        print(f"Reviews to migrate: {total}")
+
+        table = Review.__table__
+        statement = table.update().where(table.c.id == bindparam('review_id')).values({
+            code_field: bindparam(f'new_{code_field}') for code_field in RATING_CODE_FIELDS.values()
+        })
+
+        started = time.perf_counter()
+        done = 0
+        last_id = 0
+        while True:
+            rows = db.session.query(Review.id, *(getattr(Review, field) for field in RATING_FIELDS)).filter(
+                missing,
+                Review.id > last_id
+            ).order_by(Review.id).limit(batch_size).all()
+            if not rows:
+                break
+
+            db.session.execute(statement, [
+                dict({'review_id': row.id}, **{
+                    f'new_{RATING_CODE_FIELDS[field]}': processor.text_to_rating(getattr(row, field))
+                    for field in RATING_FIELDS
+                })
+                for row in rows
+            ])
+            db.session.commit()
+
+            last_id = rows[-1].id
+            done += len(rows)
+            print(f"  Migrated {done}/{total} reviews...")
+
+        elapsed = time.perf_counter() - started
+        print(f"\n✅ Migration complete! {done} reviews in {elapsed:.1f}s.")
+
+if __name__ == '__main__':
+    batch = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    migrate_rating_codes(batch)
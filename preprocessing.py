@@ -1,78 +1,179 @@
 """
 Preprocessing Module for Student Sentiment Analysis
 Handles data cleaning, text preprocessing, and sentiment analysis
+
+TextBlob (with NLTK) and NumPy are imported on first use, not with this
+module, so importing the web app stays cheap on serverless cold starts
 """
 
+import os
 import re
-import string
-from textblob import TextBlob
-from collections import Counter
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+
+# Naive created_at values are converted to epoch seconds against this
+_EPOCH = datetime(1970, 1, 1)
+
+# Rating fields collected for every subject review
+RATING_FIELDS = ['teaching', 'course_content', 'examination', 'lab_support', 'teaching_method', 'library_support']
+
+# Mapping text to numeric ratings; any other non-empty text counts as 3
+RATING_MAP = {
+    'excellent': 5,
+    'very good': 4,
+    'good': 4,
+    'average': 3,
+    'fair': 3,
+    'poor': 2,
+    'bad': 2,
+    'very bad': 1,
+    'terrible': 1
+}
+DEFAULT_RATING = 3
+
+# Each rating field is also stored as a small integer code (0 for no rating,
+# else the 1-5 value of text_to_rating) in a column named by RATING_CODE_FIELDS;
+# RATING_LABELS is the content of the rating_label lookup table
+RATING_CODE_FIELDS = {field: f'{field}_code' for field in RATING_FIELDS}
+RATING_LABELS = {0: 'Not rated', 1: 'Very bad', 2: 'Poor', 3: 'Average', 4: 'Good', 5: 'Excellent'}
+
+# Sentiment labels reported by the analytics
+SENTIMENT_LABELS = ('happy', 'neutral', 'bad')
+
+# Polarity above +threshold is happy and below -threshold is bad; run
+# rescore_sentiment.py after changing it so stored labels follow
+SENTIMENT_THRESHOLD = 0.1
+
+# Additive columns of a review rollup row: review count, per-field rating sums
+# and 1-5 histograms, sentiment label counts and the polarity sum
+ROLLUP_COLUMNS = (
+    ['review_count']
+    + [f'{field}_{suffix}' for field in RATING_FIELDS for suffix in ('sum', 1, 2, 3, 4, 5)]
+    + [f'{label}_count' for label in SENTIMENT_LABELS]
+    + ['polarity_sum']
+)
+
+# Maximum number of distinct texts kept in the sentiment result cache (0 disables it)
+SENTIMENT_CACHE_SIZE = int(os.getenv('SENTIMENT_CACHE_SIZE', '10000'))
+
+# Stopwords dropped from keyword extraction
+STOPWORDS = frozenset([
+    'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', 
+    'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself',
+    'she', 'her', 'hers', 'herself', 'it', 'its', 'itself', 'they', 'them',
+    'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this',
+    'that', 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been',
+    'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing',
+    'a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as', 'until',
+    'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against', 'between',
+    'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to',
+    'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again',
+    'further', 'then', 'once'
+])
+
+# One pass strips email addresses, URLs, and every character that is not a
+# lowercase letter or whitespace; splitting the result gives the tokens.
+# A word is an email address when the part before any URL in it contains an
+# '@' with text on both sides, in which case the whole word is dropped.
+NOISE_PATTERN = re.compile(
+    r'(?<!\S)(?:(?!http\S|www\S)\S)+@(?:(?!http\S|www\S)\S)+\S*'  # Email addresses
+    r'|(?:http|www)\S+'                                         # URLs
+    r'|[^a-z\s]+'                                               # Digits and symbols
+)
 
 class TextPreprocessor:
     """Text preprocessing utilities for sentiment analysis"""
     
     def __init__(self):
-        self.stopwords = set([
-            'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', 
-            'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself',
-            'she', 'her', 'hers', 'herself', 'it', 'its', 'itself', 'they', 'them',
-            'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this',
-            'that', 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been',
-            'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing',
-            'a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as', 'until',
-            'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against', 'between',
-            'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to',
-            'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again',
-            'further', 'then', 'once'
-        ])
+        self.stopwords = STOPWORDS
+    
+    def tokenize(self, text):
+        """Normalize text and split it into tokens in a single pass"""
+        if not text or text == 'submitted':
+            return []
+        return NOISE_PATTERN.sub('', text.lower()).split()
     
     def clean_text(self, text):
         """Clean and normalize text"""
-        if not text or text == 'submitted':
-            return ""
-        
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove URLs
-        text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
-        
-        # Remove email addresses
-        text = re.sub(r'\S+@\S+', '', text)
-        
-        # Remove special characters and digits
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
-        
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        return ' '.join(self.tokenize(text))
+    
+    def filter_tokens(self, tokens):
+        """Drop stopwords and words of two letters or less"""
+        stopwords = self.stopwords
+        return [word for word in tokens if len(word) > 2 and word not in stopwords]
     
     def remove_stopwords(self, text):
         """Remove stopwords from text"""
-        words = text.split()
-        filtered_words = [word for word in words if word not in self.stopwords and len(word) > 2]
-        return ' '.join(filtered_words)
+        return ' '.join(self.filter_tokens(text.split()))
+    
+    def preprocess_tokens(self, text):
+        """Complete preprocessing pipeline, returning tokens"""
+        return self.filter_tokens(self.tokenize(text))
     
     def preprocess(self, text):
         """Complete preprocessing pipeline"""
-        text = self.clean_text(text)
-        text = self.remove_stopwords(text)
-        return text
+        return ' '.join(self.preprocess_tokens(text))
     
     def extract_keywords(self, text, top_n=10):
         """Extract top keywords from text"""
-        text = self.preprocess(text)
-        words = text.split()
-        word_freq = Counter(words)
+        word_freq = Counter(self.preprocess_tokens(text))
         return word_freq.most_common(top_n)
 
 
 class SentimentAnalyzer:
     """Enhanced sentiment analysis with detailed metrics"""
     
-    def __init__(self):
+    def __init__(self, cache_size=None):
         self.preprocessor = TextPreprocessor()
+        # LRU cache of results keyed on the cleaned text
+        self.cache_size = SENTIMENT_CACHE_SIZE if cache_size is None else cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+    
+    def cache_info(self):
+        """Get sentiment cache statistics"""
+        with self._cache_lock:
+            return {
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'evictions': self.cache_evictions,
+                'size': len(self._cache),
+                'max_size': self.cache_size
+            }
+    
+    def clear_cache(self):
+        """Drop every cached result and reset the counters"""
+        with self._cache_lock:
+            self._cache.clear()
+            self.cache_hits = 0
+            self.cache_misses = 0
+            self.cache_evictions = 0
+    
+    def _cache_get(self, key):
+        """Look up a cached result, marking it as recently used"""
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is None:
+                self.cache_misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return dict(result)
+    
+    def _cache_put(self, key, result):
+        """Store a result, evicting the least recently used entries past the size bound"""
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = dict(result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.cache_evictions += 1
     
     def analyze_sentiment(self, text):
         """
@@ -80,25 +181,65 @@ class SentimentAnalyzer:
         Returns: dict with sentiment, polarity, subjectivity, and label
         """
         if not text or text == 'submitted':
-            return {
-                'sentiment': 'neutral',
-                'polarity': 0.0,
-                'subjectivity': 0.0,
-                'label': 'neutral'
-            }
+            return self._build_result(0.0, 0.0)
         
         # Clean text
         cleaned_text = self.preprocessor.clean_text(text)
         
+        cached = self._cache_get(cleaned_text)
+        if cached is not None:
+            return cached
+        
         # Analyze with TextBlob
+        from textblob import TextBlob
         blob = TextBlob(cleaned_text)
-        polarity = blob.sentiment.polarity
-        subjectivity = blob.sentiment.subjectivity
+        result = self._build_result(blob.sentiment.polarity, blob.sentiment.subjectivity)
+        self._cache_put(cleaned_text, result)
+        
+        return result
+    
+    def analyze_many(self, texts):
+        """
+        Analyze sentiment of a list of texts in one batch
+        Scores every distinct uncached text with the PolarityEngine instead of
+        building a TextBlob per text
+        Returns: list of dicts like analyze_sentiment, in the same order
+        """
+        results = [None] * len(texts)
+        pending = {}  # cleaned text -> positions waiting for it
         
+        for index, text in enumerate(texts):
+            if not text or text == 'submitted':
+                results[index] = self._build_result(0.0, 0.0)
+                continue
+            tokens = self.preprocessor.tokenize(text)
+            cleaned_text = ' '.join(tokens)
+            if cleaned_text in pending:
+                pending[cleaned_text][1].append(index)
+                continue
+            cached = self._cache_get(cleaned_text)
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending[cleaned_text] = (tokens, [index])
+        
+        if pending:
+            unique_texts = list(pending)
+            scores = get_polarity_engine().score([pending[text][0] for text in unique_texts])
+            for cleaned_text, (polarity, subjectivity) in zip(unique_texts, scores):
+                result = self._build_result(polarity, subjectivity)
+                self._cache_put(cleaned_text, result)
+                for index in pending[cleaned_text][1]:
+                    results[index] = dict(result)
+        
+        return results
+    
+    def _build_result(self, polarity, subjectivity):
+        """Build the sentiment dict for a polarity and subjectivity score"""
         # Determine sentiment label (mapped to happy/neutral/bad)
-        if polarity > 0.1:
+        if polarity > SENTIMENT_THRESHOLD:
             sentiment = 'happy'
-        elif polarity < -0.1:
+        elif polarity < -SENTIMENT_THRESHOLD:
             sentiment = 'bad'
         else:
             sentiment = 'neutral'
@@ -132,11 +273,197 @@ class SentimentAnalyzer:
         return analysis['polarity']
 
 
+def load_numpy():
+    """NumPy, or None when it is not installed (PolarityEngine then scores one text at a time)"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class PolarityEngine:
+    """
+    Batch scorer reproducing TextBlob's (pattern) polarity and subjectivity
+    for text already tokenized by TextPreprocessor.tokenize
+    
+    The sentiment lexicon is compiled once into arrays. Texts without negation
+    words are scored together with NumPy array operations; texts with negations
+    go through a direct port of pattern's assessment rules.
+    """
+    
+    def __init__(self):
+        from textblob.en import sentiment as lexicon
+        'good' in lexicon  # Lexicon is a lazy dict: force the XML to load
+        self.np = np = load_numpy()
+        
+        self.negations = frozenset(lexicon.negations)
+        self.is_adverb = lexicon.modifier
+        self.vocab = {}
+        polarity, subjectivity, intensity, modifier = [], [], [], []
+        for word, senses in dict.items(lexicon):
+            p, s, i = senses[None]
+            self.vocab[word] = len(polarity)
+            polarity.append(p)
+            subjectivity.append(s)
+            intensity.append(i)
+            modifier.append(any(pos in senses for pos in lexicon.modifiers))
+        
+        # Plain lists for the per-text path, arrays for the vectorized path
+        self.polarity = polarity
+        self.subjectivity = subjectivity
+        self.intensity = intensity
+        self.modifier = modifier
+        if np is not None:
+            self.polarity_array = np.array(polarity, dtype=np.float64)
+            self.subjectivity_array = np.array(subjectivity, dtype=np.float64)
+            self.intensity_array = np.array(intensity, dtype=np.float64)
+            self.modifier_array = np.array(modifier, dtype=bool)
+    
+    def score(self, docs):
+        """
+        Score a list of tokenized texts
+        Returns: list of (polarity, subjectivity) tuples
+        """
+        scores = [None] * len(docs)
+        
+        simple = []
+        for index, tokens in enumerate(docs):
+            if self.np is None or not self.negations.isdisjoint(tokens):
+                scores[index] = self.score_tokens(tokens)
+            else:
+                simple.append(index)
+        
+        if simple:
+            batch = self.score_batch([docs[index] for index in simple])
+            for index, score in zip(simple, batch):
+                scores[index] = score
+        
+        return scores
+    
+    def score_tokens(self, tokens):
+        """Score one tokenized text following pattern's Sentiment.assessments"""
+        assessments = []  # [polarity, subjectivity, intensity, negated]
+        modifier = None  # Preceding modifier ("really good")
+        negation = None  # Preceding negation ("not good")
+        
+        for word in tokens:
+            index = self.vocab.get(word)
+            if index is not None:
+                p = self.polarity[index]
+                s = self.subjectivity[index]
+                i = self.intensity[index]
+                if modifier is None:
+                    assessments.append([p, s, i, False])
+                else:
+                    last = assessments[-1]
+                    last[0] = max(-1.0, min(p * last[2], +1.0))
+                    last[1] = max(-1.0, min(s * last[2], +1.0))
+                    last[2] = i
+                if negation is not None:
+                    assessments[-1][2] = 1.0 / assessments[-1][2]
+                    assessments[-1][3] = True
+                modifier = word if self.modifier[index] else None
+                negation = word if word in self.negations else None
+            else:
+                if word in self.negations:
+                    negation = word
+                # Retain negation across small words ("not a good")
+                elif negation and len(word.strip("'")) > 1:
+                    negation = None
+                # Negation preceded by a modifier ("really not good")
+                if negation is not None and modifier is not None and self.is_adverb(modifier):
+                    assessments[-1][3] = True
+                    negation = None
+                # Retain modifier across small words ("really is a good")
+                elif modifier and len(word) > 2:
+                    modifier = None
+        
+        # "not good" = slightly bad, "not bad" = slightly good
+        count = float(len(assessments) or 1)
+        polarity = sum(p * -0.5 if negated else p for p, s, i, negated in assessments) / count
+        subjectivity = sum(s for p, s, i, negated in assessments) / count
+        return polarity, subjectivity
+    
+    def score_batch(self, docs):
+        """
+        Score tokenized texts that contain no negation words with array operations
+        A known word directly preceded by a known modifier (with only short unknown
+        words in between) extends the previous assessment instead of starting a
+        new one; each assessment takes the score of its last word, scaled by the
+        intensity of the word before it.
+        """
+        np = self.np
+        lengths = np.fromiter((len(tokens) for tokens in docs), dtype=np.int64, count=len(docs))
+        words = [word for tokens in docs for word in tokens]
+        total = len(words)
+        if total == 0:
+            return [(0.0, 0.0)] * len(docs)
+        
+        ids = np.fromiter((self.vocab.get(word, -1) for word in words), dtype=np.int64, count=total)
+        word_lengths = np.fromiter((len(word) for word in words), dtype=np.int64, count=total)
+        doc = np.repeat(np.arange(len(docs)), lengths)
+        ends = np.cumsum(lengths)
+        doc_start = np.repeat(ends - lengths, lengths)
+        doc_end = np.repeat(ends, lengths)
+        position = np.arange(total)
+        
+        known = ids >= 0
+        safe_ids = np.where(known, ids, 0)
+        # Unknown words longer than two letters clear a pending modifier
+        blocker = ~known & (word_lengths > 2)
+        
+        # Index of the last known word / blocker strictly before each position
+        last_known = np.maximum.accumulate(np.where(known, position, -1))
+        prev_known = np.concatenate(([-1], last_known[:-1]))
+        prev_known = np.where(prev_known >= doc_start, prev_known, -1)
+        last_blocker = np.maximum.accumulate(np.where(blocker, position, -1))
+        prev_blocker = np.concatenate(([-1], last_blocker[:-1]))
+        
+        has_prev = prev_known >= 0
+        prev_ids = safe_ids[np.where(has_prev, prev_known, 0)]
+        attached = known & has_prev & self.modifier_array[prev_ids] & (prev_blocker < prev_known)
+        
+        scale = self.intensity_array[prev_ids]
+        p = self.polarity_array[safe_ids]
+        s = self.subjectivity_array[safe_ids]
+        p = np.where(attached, np.clip(p * scale, -1.0, 1.0), p)
+        s = np.where(attached, np.clip(s * scale, -1.0, 1.0), s)
+        
+        # An assessment ends at a known word whose next known word does not attach to it
+        first_known_from = np.minimum.accumulate(np.where(known, position, total)[::-1])[::-1]
+        next_known = np.concatenate((first_known_from[1:], [total]))
+        has_next = next_known < doc_end
+        next_attached = np.zeros(total, dtype=bool)
+        next_attached[has_next] = attached[next_known[has_next]]
+        final = known & ~next_attached
+        
+        final_doc = doc[final]
+        counts = np.bincount(final_doc, minlength=len(docs)).astype(np.float64)
+        polarity = np.bincount(final_doc, weights=p[final], minlength=len(docs)) / np.maximum(counts, 1.0)
+        subjectivity = np.bincount(final_doc, weights=s[final], minlength=len(docs)) / np.maximum(counts, 1.0)
+        return list(zip(polarity.tolist(), subjectivity.tolist()))
+
+
+_polarity_engine = None
+_polarity_engine_lock = threading.Lock()
+
+
+def get_polarity_engine():
+    """Get the process-wide PolarityEngine, compiling the lexicon on first use"""
+    global _polarity_engine
+    if _polarity_engine is None:
+        with _polarity_engine_lock:
+            if _polarity_engine is None:
+                _polarity_engine = PolarityEngine()
+    return _polarity_engine
+
+
 class ReviewDataProcessor:
     """Process review data for analysis and visualization"""
     
-    def __init__(self):
-        self.sentiment_analyzer = SentimentAnalyzer()
+    def __init__(self, sentiment_analyzer=None):
+        self.sentiment_analyzer = sentiment_analyzer or SentimentAnalyzer()
         self.preprocessor = TextPreprocessor()
     
     def process_review(self, review):
@@ -186,20 +513,24 @@ class ReviewDataProcessor:
         
         text_value = text_value.lower().strip()
         
-        # Mapping text to numeric ratings
-        rating_map = {
-            'excellent': 5,
-            'very good': 4,
-            'good': 4,
-            'average': 3,
-            'fair': 3,
-            'poor': 2,
-            'bad': 2,
-            'very bad': 1,
-            'terrible': 1
-        }
-        
-        return rating_map.get(text_value, 3)  # Default to 3 if unknown
+        return RATING_MAP.get(text_value, DEFAULT_RATING)  # Default to 3 if unknown
+    
+    def review_rating(self, review, field):
+        """
+        Numeric rating of one field of a review
+        Reads the stored rating code, falling back to text_to_rating for rows
+        written before the codes existed (see migrate_rating_codes.py)
+        """
+        code = getattr(review, RATING_CODE_FIELDS[field], None)
+        if code is not None:
+            return code
+        return self.text_to_rating(getattr(review, field, ''))
+    
+    def encode_ratings(self, reviews):
+        """Store the rating code of every rating field on each review"""
+        for review in reviews:
+            for field, code_field in RATING_CODE_FIELDS.items():
+                setattr(review, code_field, self.text_to_rating(getattr(review, field, '')))
     
     def calculate_average_ratings(self, reviews):
         """Calculate average ratings for each category"""
@@ -210,8 +541,7 @@ class ReviewDataProcessor:
             values = []
             for review in reviews:
                 try:
-                    text_value = getattr(review, field, '')
-                    numeric_value = self.text_to_rating(text_value)
+                    numeric_value = self.review_rating(review, field)
                     if numeric_value > 0:
                         values.append(numeric_value)
                 except:
@@ -221,24 +551,89 @@ class ReviewDataProcessor:
         
         return averages
     
+    def get_review_text(self, review):
+        """Build the text scored for a review: its comment followed by its rating text"""
+        # Include rating text as part of the sentiment input so non-empty
+        # reviews without comments still contribute to trends.
+        comment = (review.comment or '').strip()
+        # Build synthetic text from ratings (e.g., "good bad average")
+        rating_tokens = []
+        for f in RATING_FIELDS:
+            val = getattr(review, f, '') or ''
+            if isinstance(val, str) and val.strip():
+                rating_tokens.append(val.strip())
+        return ' '.join([comment] + rating_tokens).strip() or 'submitted'
+    
+    def score_review(self, review):
+        """
+        Run sentiment analysis for a review and store the result on it
+        Returns the sentiment dict
+        """
+        sentiment = self.sentiment_analyzer.analyze_sentiment(self.get_review_text(review))
+        review.sentiment_label = sentiment['sentiment']
+        review.sentiment_polarity = sentiment['polarity']
+        review.sentiment_subjectivity = sentiment['subjectivity']
+        return sentiment
+    
+    def analyze_review(self, review):
+        """
+        Get the sentiment of a review, preferring the values stored at write time
+        Falls back to scoring the review text for rows that were never scored
+        """
+        label = getattr(review, 'sentiment_label', None)
+        if label:
+            return {
+                'sentiment': label,
+                'polarity': review.sentiment_polarity or 0.0,
+                'subjectivity': review.sentiment_subjectivity or 0.0,
+                'label': label
+            }
+        return self.sentiment_analyzer.analyze_sentiment(self.get_review_text(review))
+    
+    def score_reviews(self, reviews):
+        """Batch version of score_review: score and store sentiment on every review"""
+        reviews = list(reviews)
+        results = self.sentiment_analyzer.analyze_many([self.get_review_text(review) for review in reviews])
+        for review, sentiment in zip(reviews, results):
+            review.sentiment_label = sentiment['sentiment']
+            review.sentiment_polarity = sentiment['polarity']
+            review.sentiment_subjectivity = sentiment['subjectivity']
+        return results
+    
+    def analyze_reviews(self, reviews):
+        """
+        Batch version of analyze_review: stored sentiment where available,
+        the rest scored together with analyze_many
+        Returns list of sentiment dicts in the same order as reviews
+        """
+        results = []
+        unscored = []
+        for review in reviews:
+            label = getattr(review, 'sentiment_label', None)
+            if label:
+                results.append({
+                    'sentiment': label,
+                    'polarity': review.sentiment_polarity or 0.0,
+                    'subjectivity': review.sentiment_subjectivity or 0.0,
+                    'label': label
+                })
+            else:
+                unscored.append((len(results), review))
+                results.append(None)
+        
+        if unscored:
+            scored = self.sentiment_analyzer.analyze_many([self.get_review_text(review) for _, review in unscored])
+            for (index, _), sentiment in zip(unscored, scored):
+                results[index] = sentiment
+        
+        return results
+    
     def get_sentiment_distribution(self, reviews):
         """Get distribution of sentiments across reviews"""
         sentiments = {'happy': 0, 'neutral': 0, 'bad': 0}
         
-        # Include rating text as part of the sentiment input so non-empty
-        # reviews without comments still contribute to trends.
-        fields = ['teaching', 'course_content', 'examination', 'lab_support', 'teaching_method', 'library_support']
-        
-        for review in reviews:
-            comment = (review.comment or '').strip()
-            # Build synthetic text from ratings (e.g., "good bad average")
-            rating_tokens = []
-            for f in fields:
-                val = getattr(review, f, '') or ''
-                if isinstance(val, str) and val.strip():
-                    rating_tokens.append(val.strip())
-            combined_text = ' '.join([comment] + rating_tokens).strip() or 'submitted'
-            sentiment = self.sentiment_analyzer.analyze_sentiment(combined_text)['sentiment']
+        for analysis in self.analyze_reviews(reviews):
+            sentiment = analysis['sentiment']
             if sentiment in sentiments:
                 sentiments[sentiment] += 1
         
@@ -250,8 +645,7 @@ class ReviewDataProcessor:
         
         for review in reviews:
             try:
-                text_value = getattr(review, field, '')
-                numeric_value = self.text_to_rating(text_value)
+                numeric_value = self.review_rating(review, field)
                 if numeric_value in distribution:
                     distribution[numeric_value] += 1
             except:
@@ -288,18 +682,7 @@ class ReviewDataProcessor:
         """Get sentiment trends over time"""
         time_data = []
         
-        fields = ['teaching', 'course_content', 'examination', 'lab_support', 'teaching_method', 'library_support']
-        
-        for review in reviews:
-            # Combine comment with rating text for better sentiment signal
-            comment = (review.comment or '').strip()
-            rating_tokens = []
-            for f in fields:
-                val = getattr(review, f, '') or ''
-                if isinstance(val, str) and val.strip():
-                    rating_tokens.append(val.strip())
-            combined_text = ' '.join([comment] + rating_tokens).strip() or 'submitted'
-            sentiment = self.sentiment_analyzer.analyze_sentiment(combined_text)
+        for review, sentiment in zip(reviews, self.analyze_reviews(reviews)):
             time_data.append({
                 'date': review.created_at.strftime('%Y-%m-%d'),
                 'sentiment': sentiment['sentiment'],
@@ -307,13 +690,390 @@ class ReviewDataProcessor:
             })
         
         return time_data
+    
+    def analyze_review_record(self, review, sentiment=None):
+        """
+        Analyze a single review once for every dashboard panel
+        sentiment may be passed in when it was already computed in a batch
+        Returns dict with numeric ratings per field, sentiment and polarity
+        """
+        if sentiment is None:
+            sentiment = self.analyze_review(review)
+        return {
+            'ratings': {field: self.review_rating(review, field) for field in RATING_FIELDS},
+            'sentiment': sentiment['sentiment'],
+            'polarity': sentiment['polarity']
+        }
+    
+    def _new_group(self):
+        """Empty accumulator for per-group rating and sentiment totals"""
+        return {
+            'count': 0,
+            'rating_sums': {field: 0 for field in RATING_FIELDS},
+            'rating_counts': {field: 0 for field in RATING_FIELDS},
+            'rating_distribution': {field: {1: 0, 2: 0, 3: 0, 4: 0, 5: 0} for field in RATING_FIELDS},
+            'sentiment_distribution': {'happy': 0, 'neutral': 0, 'bad': 0},
+            'polarity_sum': 0.0
+        }
+    
+    def _add_to_group(self, group, analysis):
+        """Add one analyzed review to a group accumulator"""
+        group['count'] += 1
+        for field, value in analysis['ratings'].items():
+            if value > 0:
+                group['rating_sums'][field] += value
+                group['rating_counts'][field] += 1
+            if value in group['rating_distribution'][field]:
+                group['rating_distribution'][field][value] += 1
+        sentiment = analysis['sentiment']
+        if sentiment not in group['sentiment_distribution']:
+            sentiment = 'neutral'
+        group['sentiment_distribution'][sentiment] += 1
+        group['polarity_sum'] += analysis['polarity']
+    
+    def group_averages(self, group):
+        """Average ratings for a group accumulator, same shape as calculate_average_ratings"""
+        return {
+            field: round(group['rating_sums'][field] / group['rating_counts'][field], 2) if group['rating_counts'][field] else 0
+            for field in RATING_FIELDS
+        }
+    
+    def rollup_totals(self, reviews, totals=None):
+        """
+        Add reviews to per-(regulation, semester, subject, day) totals
+        Each value is a dict keyed by ROLLUP_COLUMNS, matching one rollup row;
+        pass totals to keep accumulating across batches
+        Returns the totals dict
+        """
+        totals = {} if totals is None else totals
+        reviews = list(reviews)
+        
+        for review, sentiment in zip(reviews, self.analyze_reviews(reviews)):
+            day = review.created_at.date() if review.created_at else None
+            key = (review.regulation_id, review.semester_id, review.subject_id, day)
+            row = totals.get(key)
+            if row is None:
+                row = totals[key] = dict.fromkeys(ROLLUP_COLUMNS, 0)
+                row['polarity_sum'] = 0.0
+            
+            row['review_count'] += 1
+            for field in RATING_FIELDS:
+                value = self.review_rating(review, field)
+                if value > 0:
+                    row[f'{field}_sum'] += value
+                    row[f'{field}_{value}'] += 1
+            label = sentiment['sentiment'] if sentiment['sentiment'] in SENTIMENT_LABELS else 'neutral'
+            row[f'{label}_count'] += 1
+            row['polarity_sum'] += sentiment['polarity']
+        
+        return totals
+    
+    def get_dashboard_data(self, reviews, semester_regulations=None, top_themes=20):
+        """
+        Compute the data behind every dashboard panel in a single pass over reviews
+        semester_regulations maps semester id to regulation id; reviews are
+        grouped under their semester's regulation when it is known
+        Returns dict with overall, per-semester, per-subject, per-regulation
+        and per-date group accumulators plus the common themes
+        """
+        semester_regulations = semester_regulations or {}
+        overall = self._new_group()
+        by_semester = {}
+        by_subject = {}
+        by_regulation = {}
+        by_date = {}
+        theme_text = []
+        
+        sentiments = self.analyze_reviews(reviews)
+        for review, sentiment in zip(reviews, sentiments):
+            analysis = self.analyze_review_record(review, sentiment)
+            regulation_id = semester_regulations.get(review.semester_id, review.regulation_id)
+            date = review.created_at.strftime('%Y-%m-%d')
+            
+            self._add_to_group(overall, analysis)
+            for groups, key in ((by_semester, review.semester_id), (by_subject, review.subject_id),
+                                (by_regulation, regulation_id), (by_date, date)):
+                if key not in groups:
+                    groups[key] = self._new_group()
+                self._add_to_group(groups[key], analysis)
+            
+            # Collect theme text the same way as extract_common_themes
+            comment = review.comment or review.feedback
+            if comment and comment != 'submitted':
+                theme_text.append(comment)
+            for field in RATING_FIELDS:
+                rating_text = getattr(review, field, '')
+                if rating_text and rating_text.strip():
+                    theme_text.append(rating_text)
+        
+        themes = self.preprocessor.extract_keywords(' '.join(theme_text), top_themes) if theme_text else []
+        
+        return {
+            'overall': overall,
+            'by_semester': by_semester,
+            'by_subject': by_subject,
+            'by_regulation': by_regulation,
+            'by_date': by_date,
+            'themes': themes
+        }
+
+
+class ReviewSnapshot:
+    """
+    Columnar in-memory copy of the review table for the analytics
+    Reviews are held in parallel typed NumPy arrays instead of ORM objects:
+    int32 ids and foreign keys, the uint8 rating code of each rating field
+    (see RATING_CODE_FIELDS), created_at as int64 epoch
+    seconds (-1 when unknown), a uint8 index into SENTIMENT_LABELS and float32
+    polarity, about 40 bytes per review. append() takes rows in id order, so
+    the snapshot is refreshed by fetching only ids above last_id
+    """
+    
+    ID_COLUMNS = ('id', 'student_id', 'regulation_id', 'semester_id', 'subject_id')
+    
+    def __init__(self, processor=None):
+        np = load_numpy()
+        if np is None:
+            raise ImportError("ReviewSnapshot requires NumPy")
+        self.np = np
+        self.processor = processor or get_processor()
+        self.lock = threading.Lock()
+        # Rollup totals the snapshot was last checked against (see the app's refresh)
+        self.checked_totals = None
+        self.dtypes = dict(
+            [(name, np.int32) for name in self.ID_COLUMNS]
+            + [(field, np.uint8) for field in RATING_FIELDS]
+            + [('created_at', np.int64), ('sentiment', np.uint8), ('polarity', np.float32)]
+        )
+        self.clear()
+    
+    def clear(self):
+        """Drop every review, e.g. before reloading after rows changed in place"""
+        self.size = 0
+        self.last_id = 0
+        self._arrays = {name: self.np.empty(0, dtype=dtype) for name, dtype in self.dtypes.items()}
+    
+    def column(self, name):
+        """View of one column over the loaded reviews"""
+        return self._arrays[name][:self.size]
+    
+    @property
+    def nbytes(self):
+        """Memory used by the loaded reviews"""
+        return sum(self.column(name).nbytes for name in self.dtypes)
+    
+    def _reserve(self, extra):
+        """Grow the arrays geometrically so appends stay amortized O(1) per review"""
+        needed = self.size + extra
+        capacity = len(self._arrays['id'])
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        for name, array in self._arrays.items():
+            grown = self.np.empty(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            # Readers keep views of the old arrays, so replace rather than resize in place
+            self._arrays[name] = grown
+    
+    def append(self, reviews):
+        """
+        Add reviews with ids above last_id, in id order
+        reviews need the ID_COLUMNS, rating codes, created_at and the stored
+        sentiment (the rating text and comment too, for rows without them)
+        """
+        reviews = [review for review in reviews if review.id > self.last_id]
+        if not reviews:
+            return 0
+        sentiments = self.processor.analyze_reviews(reviews)
+        count = len(reviews)
+        self._reserve(count)
+        start, end = self.size, self.size + count
+        
+        for name in self.ID_COLUMNS:
+            self._arrays[name][start:end] = [getattr(review, name) for review in reviews]
+        for field in RATING_FIELDS:
+            self._arrays[field][start:end] = [self.processor.review_rating(review, field) for review in reviews]
+        self._arrays['created_at'][start:end] = [
+            int((review.created_at - _EPOCH).total_seconds()) if review.created_at else -1 for review in reviews
+        ]
+        labels = {label: index for index, label in enumerate(SENTIMENT_LABELS)}
+        neutral = labels['neutral']
+        self._arrays['sentiment'][start:end] = [labels.get(sentiment['sentiment'], neutral) for sentiment in sentiments]
+        self._arrays['polarity'][start:end] = [sentiment['polarity'] for sentiment in sentiments]
+        
+        self.size = end
+        self.last_id = int(self._arrays['id'][end - 1])
+        return count
+    
+    def mask(self, regulation_id=None, semester_id=None, subject_id=None, student_id=None, start=None, end=None):
+        """
+        Boolean selection for the analytics filters, or None when nothing is filtered
+        start / end are inclusive dates, as in the app's review filters
+        """
+        selected = None
+        
+        def narrow(condition):
+            return condition if selected is None else selected & condition
+        
+        for name, value in (('regulation_id', regulation_id), ('semester_id', semester_id),
+                            ('subject_id', subject_id), ('student_id', student_id)):
+            if value is not None:
+                selected = narrow(self.column(name) == value)
+        created_at = self.column('created_at')
+        if start is not None:
+            selected = narrow(created_at >= (start - _EPOCH.date()).days * 86400)
+        if end is not None:
+            selected = narrow((created_at >= 0) & (created_at < ((end - _EPOCH.date()).days + 1) * 86400))
+        return selected
+    
+    def _select(self, name, mask):
+        column = self.column(name)
+        return column if mask is None else column[mask]
+    
+    def calculate_average_ratings(self, mask=None):
+        """Same result as ReviewDataProcessor.calculate_average_ratings, with one bincount per field"""
+        averages = {}
+        for field in RATING_FIELDS:
+            counts = self.np.bincount(self._select(field, mask), minlength=6)
+            rated = int(counts[1:].sum())
+            averages[field] = round(int(counts @ self.np.arange(6)) / rated, 2) if rated else 0
+        return averages
+    
+    def get_rating_distribution(self, field='teaching', mask=None):
+        """Same result as ReviewDataProcessor.get_rating_distribution"""
+        counts = self.np.bincount(self._select(field, mask), minlength=6)
+        return {value: int(counts[value]) for value in range(1, 6)}
+    
+    def get_sentiment_distribution(self, mask=None):
+        """Count of each sentiment label"""
+        counts = self.np.bincount(self._select('sentiment', mask), minlength=len(SENTIMENT_LABELS))
+        return {label: int(counts[index]) for index, label in enumerate(SENTIMENT_LABELS)}
+    
+    def group_totals(self, keys, mask=None):
+        """
+        Group accumulators (shaped like ReviewDataProcessor._new_group) per distinct key
+        keys is an array aligned with the loaded reviews; every total is one bincount
+        Returns: {key: group}
+        """
+        np = self.np
+        if mask is not None:
+            keys = keys[mask]
+        if not len(keys):
+            return {}
+        unique, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        groups_count = len(unique)
+        label_count = len(SENTIMENT_LABELS)
+        
+        counts = np.bincount(inverse, minlength=groups_count).tolist()
+        sentiments = np.bincount(inverse * label_count + self._select('sentiment', mask),
+                                 minlength=groups_count * label_count).reshape(groups_count, label_count).tolist()
+        polarity = np.bincount(inverse, weights=self._select('polarity', mask).astype(np.float64),
+                               minlength=groups_count).tolist()
+        ratings = {}
+        for field in RATING_FIELDS:
+            distribution = np.bincount(inverse * 6 + self._select(field, mask),
+                                       minlength=groups_count * 6).reshape(groups_count, 6)
+            ratings[field] = (
+                (distribution @ np.arange(6)).tolist(),
+                distribution[:, 1:].sum(axis=1).tolist(),
+                distribution.tolist()
+            )
+        
+        # Keys in order of first appearance, as when grouping review by review
+        keys = unique.tolist()
+        groups = {}
+        for index in np.argsort(first, kind='stable').tolist():
+            groups[keys[index]] = {
+                'count': counts[index],
+                'rating_sums': {field: ratings[field][0][index] for field in RATING_FIELDS},
+                'rating_counts': {field: ratings[field][1][index] for field in RATING_FIELDS},
+                'rating_distribution': {
+                    field: {value: ratings[field][2][index][value] for value in range(1, 6)} for field in RATING_FIELDS
+                },
+                'sentiment_distribution': dict(zip(SENTIMENT_LABELS, sentiments[index])),
+                'polarity_sum': polarity[index]
+            }
+        return groups
+    
+    def get_dashboard_data(self, mask=None, semester_regulations=None):
+        """
+        The group accumulators of ReviewDataProcessor.get_dashboard_data, from
+        grouped bincounts instead of a pass over ORM objects. The snapshot holds
+        no text, so themes are left to the caller
+        """
+        np = self.np
+        overall = self.group_totals(np.zeros(self.size, dtype=np.int8), mask).get(0) or self.processor._new_group()
+        
+        # Reviews are grouped under their semester's regulation when it is known
+        regulation_ids = self.column('regulation_id')
+        semester_ids = self.column('semester_id')
+        if semester_regulations and self.size:
+            lookup = np.full(max(max(semester_regulations), int(semester_ids.max())) + 1, -1, dtype=np.int64)
+            lookup[list(semester_regulations)] = list(semester_regulations.values())
+            mapped = lookup[semester_ids]
+            regulation_ids = np.where(mapped >= 0, mapped, regulation_ids)
+        
+        created_at = self.column('created_at')
+        dated = created_at >= 0
+        date_mask = dated if mask is None else mask & dated
+        by_day = self.group_totals(created_at // 86400, date_mask)
+        by_date = {
+            (_EPOCH.date() + timedelta(days=day)).strftime('%Y-%m-%d'): group for day, group in by_day.items()
+        }
+        
+        return {
+            'overall': overall,
+            'by_semester': self.group_totals(semester_ids, mask),
+            'by_subject': self.group_totals(self.column('subject_id'), mask),
+            'by_regulation': self.group_totals(regulation_ids, mask),
+            'by_date': by_date
+        }
+    
+    def totals(self):
+        """(review count, happy count, bad count), to compare with the rollup totals"""
+        sentiments = self.get_sentiment_distribution()
+        return self.size, sentiments['happy'], sentiments['bad']
+
+
+# Shared processor so the sentiment cache survives across requests
+_shared_processor = None
+_shared_processor_lock = threading.Lock()
+
+
+def get_processor():
+    """Get the process-wide ReviewDataProcessor"""
+    global _shared_processor
+    if _shared_processor is None:
+        with _shared_processor_lock:
+            if _shared_processor is None:
+                _shared_processor = ReviewDataProcessor()
+    return _shared_processor
+
+
+# Shared snapshot, refreshed by the app before each use
+_shared_snapshot = None
+_shared_snapshot_lock = threading.Lock()
+
+
+def get_review_snapshot():
+    """Get the process-wide ReviewSnapshot, or None when NumPy is not installed"""
+    global _shared_snapshot
+    if _shared_snapshot is None:
+        with _shared_snapshot_lock:
+            if _shared_snapshot is None and load_numpy() is not None:
+                _shared_snapshot = ReviewSnapshot()
+    return _shared_snapshot
+
+
+def clear_sentiment_cache():
+    """Clear the shared sentiment cache (e.g. after changing the sentiment thresholds)"""
+    get_processor().sentiment_analyzer.clear_cache()
 
 
 # Utility functions for quick access
 def analyze_text_sentiment(text):
     """Quick function to analyze text sentiment"""
-    analyzer = SentimentAnalyzer()
-    return analyzer.analyze_sentiment(text)
+    return get_processor().sentiment_analyzer.analyze_sentiment(text)
 
 
 def preprocess_text(text):
@@ -324,7 +1084,7 @@ def preprocess_text(text):
 
 def get_review_statistics(reviews):
     """Get comprehensive statistics for a set of reviews"""
-    processor = ReviewDataProcessor()
+    processor = get_processor()
     
     stats = {
         'total_reviews': len(reviews),
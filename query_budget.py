@@ -0,0 +1,129 @@
+"""
+SQL statement budgets for routes
+count_queries() records the statements executed on the current thread while
+it is open. A view decorated with @query_budget(n) is run inside one, along
+with the body of a streamed response, and going over n statements
+- raises QueryBudgetExceeded when the app is testing (or QUERY_BUDGET_STRICT
+  is set), so a test client call or check_query_budgets.py fails
+- logs a warning with the statements in development
+and is not counted at all otherwise.
+"""
+import os
+import threading
+from functools import wraps
+from flask import current_app, make_response, request
+from sqlalchemy import event
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(Exception):
+    """A route ran more SQL statements than its budget"""
+
+    def __init__(self, endpoint, budget, statements):
+        self.endpoint = endpoint
+        self.budget = budget
+        self.statements = statements
+        super().__init__(f"{endpoint} ran {len(statements)} SQL statements (budget {budget})")
+
+
+class count_queries:
+    """
+    Context recording the SQL statements of the current thread
+    The same counter can be entered again to keep adding to it
+    """
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        counters = getattr(_local, 'counters', None)
+        if counters is None:
+            counters = _local.counters = []
+        counters.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _local.counters.remove(self)
+        return False
+
+
+def record_statement(conn, cursor, statement, parameters, context, executemany):
+    for counter in getattr(_local, 'counters', ()):
+        counter.statements.append(statement)
+
+
+def init_query_budget(app, db):
+    """Record the statements of the engine of db for count_queries()"""
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record_statement)
+
+
+def budget_mode():
+    """'raise', 'warn' or None for the current app"""
+    strict = current_app.config.get('QUERY_BUDGET_STRICT')
+    if strict or (strict is None and current_app.testing):
+        return 'raise'
+    if current_app.debug or os.getenv('FLASK_ENV') == 'development':
+        return 'warn'
+    return None
+
+
+def check_budget(app, mode, endpoint, budget, statements):
+    if len(statements) <= budget:
+        return
+    if mode == 'raise':
+        raise QueryBudgetExceeded(endpoint, budget, statements)
+    listing = '\n'.join(f"  {' '.join(statement.split())}" for statement in statements)
+    app.logger.warning(f"{endpoint} ran {len(statements)} SQL statements (budget {budget}):\n{listing}")
+
+
+def counted_stream(body, counter, check):
+    """Iterate a streamed response body inside counter, checking the budget at the end"""
+    iterator = iter(body)
+    try:
+        while True:
+            with counter:
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    break
+            yield chunk
+        check()
+    finally:
+        close = getattr(body, 'close', None)
+        if close is not None:
+            close()
+
+
+def query_budget(max_statements):
+    """
+    Declare the most SQL statements one request to the view may run
+    Put it right below @app.route so the user loader and other decorators count
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            mode = budget_mode()
+            if mode is None:
+                return view(*args, **kwargs)
+
+            endpoint = request.endpoint or view.__name__
+            with count_queries() as counter:
+                response = make_response(view(*args, **kwargs))
+            # A streamed body is sent after the request context is gone
+            app = current_app._get_current_object()
+            check = lambda: check_budget(app, mode, endpoint, max_statements, counter.statements)
+            if response.is_streamed:
+                response.response = counted_stream(response.response, counter, check)
+            else:
+                check()
+            return response
+
+        wrapper.query_budget = max_statements
+        return wrapper
+    return decorator
@@ -0,0 +1,47 @@
+"""
+Rebuild the analytics rollups from the review table
+Creates the review_rollup table if it is missing and regenerates every row,
+e.g. after importing reviews from a SQL dump or to repair drifted totals
+"""
+import sys
+from app import app, db, Review, ReviewRollup
+from preprocessing import get_processor
+
+def rebuild_rollups(batch_size=1000):
+    """Recompute ReviewRollup from Review in one transaction"""
+    with app.app_context():
+        db.create_all()
+
+        processor = get_processor()
+        total = Review.query.count()
+        print(f"Reviews to roll up: {total}")
+
+        # Old rows stay visible to readers until the new ones commit
+        ReviewRollup.query.delete(synchronize_session=False)
+
+        totals = {}
+        done = 0
+        last_id = 0
+        while True:
+            reviews = Review.query.filter(Review.id > last_id).order_by(Review.id).limit(batch_size).all()
+            if not reviews:
+                break
+
+            processor.rollup_totals(reviews, totals)
+
+            last_id = reviews[-1].id
+            done += len(reviews)
+            db.session.expunge_all()
+            print(f"  Processed {done}/{total} reviews...")
+
+        db.session.add_all(
+            ReviewRollup(regulation_id=regulation_id, semester_id=semester_id, subject_id=subject_id, day=day, **values)
+            for (regulation_id, semester_id, subject_id, day), values in totals.items()
+        )
+        db.session.commit()
+
+        print(f"\n✅ Rebuild complete! {len(totals)} rollup rows from {done} reviews.")
+
+if __name__ == '__main__':
+    batch = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rebuild_rollups(batch)
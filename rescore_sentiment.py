@@ -0,0 +1,191 @@
+"""
+Re-score stored review sentiment across all CPU cores
+Streams review ids and text in chunks, scores them in a process pool with
+SentimentAnalyzer and writes the results back with batched UPDATEs.
+Progress is checkpointed after every chunk so an interrupted run resumes
+where it stopped.
+
+Usage:
+    python rescore_sentiment.py                 # re-score every review
+    python rescore_sentiment.py --missing       # only reviews never scored
+    python rescore_sentiment.py --workers 8 --chunk-size 5000
+    python rescore_sentiment.py --restart       # ignore an existing checkpoint
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from types import SimpleNamespace
+from sqlalchemy import bindparam, func
+from app import app, db, Review
+from preprocessing import get_processor, RATING_FIELDS
+from backfill_sentiment import add_sentiment_columns
+from rebuild_rollups import rebuild_rollups
+
+CHECKPOINT_FILE = 'rescore_sentiment.checkpoint'
+
+def forget_connections():
+    """
+    Worker initializer: drop the connection pool inherited from the parent
+    without closing its connections, which the parent is still using
+    """
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+def score_chunk(rows):
+    """
+    Worker: score one chunk of (id, comment, *rating fields) rows
+    Returns (worker pid, [(id, label, polarity, subjectivity)], seconds spent)
+    """
+    started = time.perf_counter()
+    processor = get_processor()
+    reviews = [
+        SimpleNamespace(comment=row[1], **dict(zip(RATING_FIELDS, row[2:])))
+        for row in rows
+    ]
+    results = processor.sentiment_analyzer.analyze_many([processor.get_review_text(review) for review in reviews])
+    scored = [
+        (row[0], result['sentiment'], result['polarity'], result['subjectivity'])
+        for row, result in zip(rows, results)
+    ]
+    return os.getpid(), scored, time.perf_counter() - started
+
+def load_checkpoint(path, missing_only):
+    """Last review id completed by an earlier run with the same mode, or 0"""
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('missing_only') != missing_only:
+        print(f"Ignoring checkpoint {path}: it was written by a run with different options")
+        return 0
+    return checkpoint['last_id']
+
+def save_checkpoint(path, missing_only, last_id):
+    """Record the last review id whose chunk (and every chunk before it) is written"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'last_id': last_id, 'missing_only': missing_only}, f)
+    os.replace(tmp_path, path)
+
+def read_chunks(start_id, chunk_size, missing_only):
+    """Yield lists of (id, comment, *rating fields) rows in id order, one query per chunk"""
+    columns = [Review.id, Review.comment] + [getattr(Review, field) for field in RATING_FIELDS]
+    last_id = start_id
+    while True:
+        query = db.session.query(*columns).filter(Review.id > last_id)
+        if missing_only:
+            query = query.filter(Review.sentiment_label.is_(None))
+        rows = [tuple(row) for row in query.order_by(Review.id).limit(chunk_size)]
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+def write_scores(scored):
+    """Store one chunk of scores with a single executemany UPDATE"""
+    table = Review.__table__
+    statement = table.update().where(table.c.id == bindparam('review_id')).values(
+        sentiment_label=bindparam('label'),
+        sentiment_polarity=bindparam('polarity'),
+        sentiment_subjectivity=bindparam('subjectivity')
+    )
+    db.session.execute(statement, [
+        {'review_id': review_id, 'label': label, 'polarity': polarity, 'subjectivity': subjectivity}
+        for review_id, label, polarity, subjectivity in scored
+    ])
+    db.session.commit()
+
+def rescore_sentiment(workers=None, chunk_size=2000, missing_only=False,
+                      checkpoint_path=CHECKPOINT_FILE, restart=False, rollups=True):
+    """Score reviews in a process pool, writing results and the checkpoint after every chunk"""
+    workers = workers or os.cpu_count() or 1
+    # Keep a couple of chunks queued per worker, never the whole table
+    max_pending = workers * 2
+
+    # Workers are forked at the first submit, by then with the parent's pooled
+    # connections in hand; forget_connections keeps them from touching those
+    with ProcessPoolExecutor(max_workers=workers, initializer=forget_connections) as pool, app.app_context():
+        add_sentiment_columns()
+
+        start_id = 0 if restart else load_checkpoint(checkpoint_path, missing_only)
+        remaining = db.session.query(func.count(Review.id)).filter(Review.id > start_id)
+        if missing_only:
+            remaining = remaining.filter(Review.sentiment_label.is_(None))
+        total = remaining.scalar()
+        print(f"Reviews to score: {total} (starting after id {start_id}, {workers} workers)")
+
+        started = time.perf_counter()
+        chunks = read_chunks(start_id, chunk_size, missing_only)
+        pending = {}       # future -> last review id of its chunk
+        order = []         # last ids of submitted chunks, in id order
+        finished = set()   # last ids of written chunks not yet covered by the checkpoint
+        worker_stats = {}  # pid -> [reviews, seconds]
+        done = 0
+
+        while True:
+            while len(pending) < max_pending:
+                rows = next(chunks, None)
+                if rows is None:
+                    break
+                pending[pool.submit(score_chunk, rows)] = rows[-1][0]
+                order.append(rows[-1][0])
+            if not pending:
+                break
+
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                last_id = pending.pop(future)
+                pid, scored, seconds = future.result()
+                write_scores(scored)
+
+                stats = worker_stats.setdefault(pid, [0, 0.0])
+                stats[0] += len(scored)
+                stats[1] += seconds
+                done += len(scored)
+                finished.add(last_id)
+
+            # The checkpoint only advances past chunks with no gap before them
+            checkpoint_id = None
+            while order and order[0] in finished:
+                checkpoint_id = order.pop(0)
+                finished.discard(checkpoint_id)
+            if checkpoint_id is not None:
+                save_checkpoint(checkpoint_path, missing_only, checkpoint_id)
+
+            elapsed = time.perf_counter() - started
+            print(f"  Scored {done}/{total} reviews ({done / elapsed:.0f} reviews/s)...")
+
+        elapsed = time.perf_counter() - started
+        print(f"\n✅ Re-scoring complete! {done} reviews in {elapsed:.1f}s "
+              f"({done / elapsed if elapsed else 0:.0f} reviews/s)")
+        for pid, (count, seconds) in sorted(worker_stats.items()):
+            print(f"   worker {pid}: {count} reviews in {seconds:.1f}s "
+                  f"({count / seconds if seconds else 0:.0f} reviews/s)")
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    # Rollup sentiment counts were built from the old scores
+    if rollups:
+        rebuild_rollups()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Re-score stored review sentiment in parallel')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--chunk-size', type=int, default=2000, help='reviews per chunk (default: 2000)')
+    parser.add_argument('--missing', action='store_true', help='only score reviews without stored sentiment')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE, help=f'checkpoint file (default: {CHECKPOINT_FILE})')
+    parser.add_argument('--restart', action='store_true', help='ignore an existing checkpoint')
+    parser.add_argument('--no-rollups', action='store_true', help='skip rebuilding the analytics rollups')
+    args = parser.parse_args()
+
+    rescore_sentiment(
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        missing_only=args.missing,
+        checkpoint_path=args.checkpoint,
+        restart=args.restart,
+        rollups=not args.no_rollups
+    )
@@ -0,0 +1,396 @@
+"""
+Streaming reader and batched importer for MySQL SQL dumps
+Splits a dump into statements without loading the file into memory (quoted
+strings, identifiers and comments may contain ';'), groups row INSERTs into
+executemany batches, commits every N rows and checkpoints the last committed
+statement so an import can resume after a dropped connection
+
+Usage: python sql_dump.py [sql_file]   # parse only: statement and row counts per table
+"""
+import gzip
+import json
+import os
+import re
+import sys
+import time
+from decimal import Decimal
+
+# Characters read from the dump per chunk
+READ_SIZE = 1 << 16
+
+# Outside quotes: statement end, quotes, comments
+STATEMENT_TOKEN = re.compile(r"[;'\"`#]|--(?=\s)|/\*")
+QUOTE_TOKEN = {"'": re.compile(r"[\\']"), '"': re.compile(r'[\\"]'), '`': re.compile(r'`')}
+
+INSERT_PREFIX = re.compile(
+    r"(INSERT(?:\s+IGNORE)?|REPLACE)\s+INTO\s+(`[^`]+`|\w+)\s*(\([^)]*\))?\s*VALUES\s*",
+    re.IGNORECASE
+)
+VALUE_TOKEN = re.compile(r"\s*(?:'((?:[^'\\]|\\.|'')*)'|\"((?:[^\"\\]|\\.|\"\")*)\"|(NULL)|0x([0-9a-fA-F]+)|(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)|([(),;]))", re.S | re.I)
+ESCAPES = {'n': '\n', 'r': '\r', 't': '\t', '0': '\0', 'b': '\b', 'Z': '\x1a'}
+ESCAPE_SEQUENCE = re.compile(r"\\(.)|''|\"\"", re.S)
+
+# MySQL client errors that mean the connection is gone
+CONNECTION_LOST_ERRORS = {2003, 2006, 2013, 2055}
+DUPLICATE_ENTRY = 1062
+TABLE_EXISTS = 1050
+
+
+def iter_statements(sql_file):
+    """
+    Yield (number, statement) for every statement in a dump, numbered from 1
+    Dumps ending in .gz are decompressed on the fly. Comments are dropped,
+    except MySQL /*! ... */ conditional comments, which are executable
+    """
+    number = 0
+    pieces = []      # statement text before the current segment
+    buf = ''
+    seg = 0          # start of the current statement segment in buf
+    pos = 0
+    state = None     # None, a quote character, 'line' or 'block'
+    eof = False
+
+    opener = gzip.open if sql_file.endswith('.gz') else open
+    with opener(sql_file, 'rt', encoding='utf-8') as f:
+        while True:
+            match = None
+            if state is None:
+                match = STATEMENT_TOKEN.search(buf, pos)
+                # Tokens need one character of lookahead ('--', '/*')
+                ready = match is not None and (eof or match.end() < len(buf))
+            elif state in QUOTE_TOKEN:
+                match = QUOTE_TOKEN[state].search(buf, pos)
+                ready = match is not None and (eof or match.end() < len(buf))
+            elif state == 'line':
+                end = buf.find('\n', pos)
+                ready = end >= 0
+            else:
+                end = buf.find('*/', pos)
+                ready = end >= 0
+
+            if not ready:
+                if eof:
+                    break
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    eof = True
+                    continue
+                # Keep only the unfinished statement in memory
+                buf = buf[seg:] + chunk
+                pos -= seg
+                seg = 0
+                continue
+
+            if state is None:
+                token = match.group()
+                if token == ';':
+                    statement = (''.join(pieces) + buf[seg:match.start()]).strip()
+                    pieces = []
+                    seg = pos = match.end()
+                    if statement:
+                        number += 1
+                        yield number, statement
+                elif token in QUOTE_TOKEN:
+                    state = token
+                    pos = match.end()
+                elif token == '/*' and buf.startswith('/*!', match.start()):
+                    # Conditional comment: keep it in the statement
+                    state = 'conditional'
+                    pos = match.end()
+                else:
+                    pieces.append(buf[seg:match.start()])
+                    state = 'line' if token in ('#', '--') else 'block'
+                    pos = match.end()
+            elif state in QUOTE_TOKEN:
+                if match.group() == '\\':
+                    pos = match.end() + 1
+                elif state != '`' and buf.startswith(state, match.end()):
+                    pos = match.end() + 1  # Doubled quote
+                else:
+                    state = None
+                    pos = match.end()
+            elif state == 'line':
+                state = None
+                seg = pos = end + 1
+            elif state == 'block':
+                state = None
+                seg = pos = end + 2
+            else:
+                state = None
+                pos = end + 2
+
+    statement = (''.join(pieces) + buf[seg:]).strip() if state not in ('line', 'block') else ''.join(pieces).strip()
+    if statement:
+        yield number + 1, statement
+
+
+def unescape(value):
+    """Decode the body of a MySQL quoted string"""
+    return ESCAPE_SEQUENCE.sub(lambda m: ESCAPES.get(m.group(1), m.group(1)) if m.group(1) else m.group()[0], value)
+
+
+def parse_insert(statement):
+    """
+    Split a row INSERT into its prefix and Python row values
+    Returns: (prefix like "INSERT INTO `t` (`a`, `b`)", list of row tuples), or None
+    when the statement is not an INSERT made only of literals
+    """
+    match = INSERT_PREFIX.match(statement)
+    if not match:
+        return None
+    verb, table, columns = match.groups()
+    prefix = f"{verb.upper()} INTO {table} {columns or ''}".rstrip()
+
+    rows = []
+    row = None
+    pos = match.end()
+    while pos < len(statement):
+        token = VALUE_TOKEN.match(statement, pos)
+        if not token:
+            return None  # Expressions or function calls: execute the statement as is
+        pos = token.end()
+        string, quoted, null, binary, number, punct = token.groups()
+        string = string if string is not None else quoted
+        if punct == '(':
+            if row is not None:
+                return None
+            row = []
+        elif punct == ')':
+            if row is None:
+                return None
+            rows.append(tuple(row))
+            row = None
+        elif punct == ',' or punct == ';':
+            continue
+        elif row is None:
+            return None
+        elif string is not None:
+            row.append(unescape(string))
+        elif null:
+            row.append(None)
+        elif binary:
+            row.append(bytes.fromhex(binary))
+        elif re.fullmatch(r'-?\d+', number):
+            row.append(int(number))
+        else:
+            row.append(Decimal(number))
+    if row is not None or not rows or len({len(r) for r in rows}) != 1:
+        return None
+    return prefix, rows
+
+
+def is_session_statement(statement):
+    """SET / USE statements and conditional comments, replayed when resuming"""
+    head = statement[:4].upper()
+    return head.startswith(('SET ', 'USE ', '/*!'))
+
+
+def load_checkpoint(checkpoint_file, sql_file):
+    """(last committed statement, rows imported) of an earlier run on the same file, or (0, 0)"""
+    if not checkpoint_file or not os.path.exists(checkpoint_file):
+        return 0, 0
+    with open(checkpoint_file) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('file') != os.path.abspath(sql_file) or checkpoint.get('size') != os.path.getsize(sql_file):
+        print(f"Ignoring checkpoint {checkpoint_file}: it belongs to another dump")
+        return 0, 0
+    return checkpoint['statement'], checkpoint['rows']
+
+
+def save_checkpoint(checkpoint_file, sql_file, statement, rows):
+    """Record that every statement up to statement is committed"""
+    if not checkpoint_file:
+        return
+    tmp_file = checkpoint_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump({'file': os.path.abspath(sql_file), 'size': os.path.getsize(sql_file),
+                   'statement': statement, 'rows': rows}, f)
+    os.replace(tmp_file, checkpoint_file)
+
+
+class DumpImporter:
+    """
+    Import a dump through a DB-API connection, resuming from a checkpoint
+    connect is a callable returning a new pymysql connection
+    """
+
+    # Session settings applied to every (re)connection
+    SESSION_SETUP = ["SET FOREIGN_KEY_CHECKS=0", "SET sql_mode = ''"]
+
+    def __init__(self, sql_file, connect, batch_rows=1000, commit_rows=5000, checkpoint_file=None, max_retries=5):
+        self.sql_file = sql_file
+        self.connect = connect
+        self.batch_rows = batch_rows
+        self.commit_rows = commit_rows
+        self.checkpoint_file = checkpoint_file if checkpoint_file is not None else sql_file + '.checkpoint'
+        self.max_retries = max_retries
+        self.rows = 0        # Committed or pending in the current transaction
+        self.duplicates = 0
+        self.errors = 0
+        self.statements = 0
+        self.started = None
+
+    def run(self):
+        """Import the whole dump, reconnecting and resuming when the connection drops"""
+        import pymysql
+
+        self.started = time.perf_counter()
+        retries = 0
+        while True:
+            conn = self.connect()
+            try:
+                cursor = conn.cursor()
+                for statement in self.SESSION_SETUP:
+                    cursor.execute(statement)
+                # Rows after the checkpoint were rolled back with the lost connection
+                checkpoint, self.rows = load_checkpoint(self.checkpoint_file, self.sql_file)
+                self.import_from(conn, cursor, checkpoint)
+                cursor.execute("SET FOREIGN_KEY_CHECKS=1")
+                conn.commit()
+                break
+            except pymysql.err.OperationalError as e:
+                if e.args[0] not in CONNECTION_LOST_ERRORS or retries >= self.max_retries:
+                    raise
+                retries += 1
+                print(f"  Connection lost ({e}); reconnecting, attempt {retries}/{self.max_retries}...")
+                time.sleep(min(2 ** retries, 30))
+            finally:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+        if self.checkpoint_file and os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+        elapsed = time.perf_counter() - self.started
+        print(f"\n✅ Import complete! {self.rows} rows from {self.statements} statements in {elapsed:.1f}s "
+              f"({self.rows / elapsed if elapsed else 0:.0f} rows/s)")
+        if self.duplicates:
+            print(f"   Skipped {self.duplicates} duplicate rows")
+        if self.errors:
+            print(f"   {self.errors} statements or rows failed")
+
+    def import_from(self, conn, cursor, checkpoint):
+        """Execute the statements after checkpoint, committing every commit_rows rows"""
+        if checkpoint:
+            print(f"Resuming after statement {checkpoint} (checkpoint {self.checkpoint_file})")
+        batch_prefix = None
+        batch = []
+        uncommitted = 0
+        last_number = checkpoint
+
+        for number, statement in iter_statements(self.sql_file):
+            if number <= checkpoint:
+                if is_session_statement(statement):
+                    self.execute(cursor, statement)
+                continue
+
+            parsed = parse_insert(statement)
+            if parsed and parsed[0] == batch_prefix:
+                batch.extend(parsed[1])
+            else:
+                uncommitted += self.flush(cursor, batch_prefix, batch)
+                batch_prefix, batch = parsed if parsed else (None, [])
+                if not parsed:
+                    self.execute(cursor, statement)
+            # Statements replayed after a reconnect are not counted twice
+            self.statements = number
+            last_number = number
+
+            if len(batch) >= self.batch_rows or uncommitted + len(batch) >= self.commit_rows:
+                uncommitted += self.flush(cursor, batch_prefix, batch)
+                batch = []
+            # Every statement up to last_number is executed here, so it can be checkpointed
+            if uncommitted >= self.commit_rows:
+                self.commit(conn, last_number)
+                uncommitted = 0
+
+        self.flush(cursor, batch_prefix, batch)
+        self.commit(conn, last_number)
+
+    def flush(self, cursor, prefix, rows):
+        """Insert a batch of rows with one executemany; returns the rows written"""
+        import pymysql
+
+        if not rows:
+            return 0
+        query = f"{prefix.replace('%', '%%')} VALUES ({', '.join(['%s'] * len(rows[0]))})"
+        try:
+            cursor.executemany(query, rows)
+        except pymysql.err.DatabaseError as e:
+            if e.args[0] in CONNECTION_LOST_ERRORS:
+                raise
+            # Rows already imported or rejected by the server: insert the batch
+            # row by row, skipping duplicates and reporting the rejected rows
+            written = 0
+            for row in rows:
+                try:
+                    cursor.execute(query, row)
+                    written += 1
+                except pymysql.err.DatabaseError as row_error:
+                    if row_error.args[0] in CONNECTION_LOST_ERRORS:
+                        raise
+                    if row_error.args[0] == DUPLICATE_ENTRY:
+                        self.duplicates += 1
+                    else:
+                        self.report_error(row_error)
+            self.rows += written
+            return written
+        self.rows += len(rows)
+        return len(rows)
+
+    def execute(self, cursor, statement):
+        """Run a statement that is not a batched INSERT, reporting (not raising) SQL errors"""
+        import pymysql
+
+        try:
+            cursor.execute(statement)
+        except pymysql.err.DatabaseError as e:
+            # pymysql raises server errors it has no class for (TABLE_EXISTS
+            # among them) as OperationalError, like a lost connection
+            if e.args[0] in CONNECTION_LOST_ERRORS:
+                raise
+            if e.args[0] in (TABLE_EXISTS, DUPLICATE_ENTRY):
+                return
+            self.report_error(e)
+
+    def report_error(self, error):
+        """Count a failed statement or row, printing the first few"""
+        self.errors += 1
+        if self.errors <= 5:  # Show first 5 errors
+            print(f"  Warning: {error}")
+
+    def commit(self, conn, number):
+        """Commit and checkpoint everything up to statement number"""
+        conn.commit()
+        save_checkpoint(self.checkpoint_file, self.sql_file, number, self.rows)
+        elapsed = time.perf_counter() - self.started
+        print(f"  Committed {self.rows} rows, statement {number} ({self.rows / elapsed if elapsed else 0:.0f} rows/s)...")
+
+
+def summarize_dump(sql_file):
+    """Parse a dump without a database; returns (statements, {table: rows}, unparsed statements)"""
+    statements = 0
+    rows = {}
+    unparsed = []
+    for number, statement in iter_statements(sql_file):
+        statements += 1
+        parsed = parse_insert(statement)
+        if parsed:
+            table = INSERT_PREFIX.match(statement).group(2).strip('`')
+            rows[table] = rows.get(table, 0) + len(parsed[1])
+        elif statement.upper().startswith(('INSERT', 'REPLACE')):
+            unparsed.append(number)
+    return statements, rows, unparsed
+
+
+if __name__ == '__main__':
+    sql_file = sys.argv[1] if len(sys.argv) > 1 else 'sentiment_db.sql'
+    started = time.perf_counter()
+    statements, rows, unparsed = summarize_dump(sql_file)
+    elapsed = time.perf_counter() - started
+    print(f"{sql_file}: {statements} statements, {sum(rows.values())} rows parsed in {elapsed:.2f}s")
+    for table, count in rows.items():
+        print(f"   {table}: {count} rows")
+    if unparsed:
+        print(f"   INSERT statements executed as-is (not literal-only): {unparsed[:10]}")